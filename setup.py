@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+import sys
+
 from setuptools import setup
+from setuptools.command.build_py import build_py
 
 with open('README.rst') as readme_file:
     readme = readme_file.read()
@@ -10,12 +13,25 @@ with open('HISTORY.rst') as history_file:
 
 requirements = [
     'Click>=6.0',
-    'pymongo>=3.2',
-    'motor==1.1',
+    # change streams of turbo_motor.view
+    'pymongo>=3.6',
+    'motor>=1.2,<2.0',
     'turbo>=0.4.5'
 ]
 
 
+class BuildPy(build_py):
+    """asyncio_model use native coroutines and async generators, it is
+    left out of builds by python older than 3.6
+    """
+
+    def find_package_modules(self, package, package_dir):
+        modules = build_py.find_package_modules(self, package, package_dir)
+        if sys.version_info < (3, 6):
+            modules = [m for m in modules if m[1] != 'asyncio_model']
+        return modules
+
+
 setup(
     name='turbo_motor',
     version='0.0.4',
@@ -30,7 +46,12 @@ setup(
     package_dir={'turbo_motor':
                  'turbo_motor'},
     include_package_data=True,
+    cmdclass={'build_py': BuildPy},
     install_requires=requirements,
+    extras_require={
+        # C conversion of raw documents by turbo_motor.raw.to_json
+        'bsonjs': ['python-bsonjs'],
+    },
     license="Apache Software License 2.0",
     zip_safe=False,
     keywords='turbo_motor,turbo',
@@ -40,9 +61,7 @@ setup(
         'License :: OSI Approved :: Apache Software License',
         'Natural Language :: English',
         "Programming Language :: Python :: 2",
-        'Programming Language :: Python :: 2.6',
         'Programming Language :: Python :: 2.7',
-        'Programming Language :: Python :: 3.3',
         'Programming Language :: Python :: 3.4',
         'Programming Language :: Python :: 3.5',
         'Programming Language :: Python :: 3.6',
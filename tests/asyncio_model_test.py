@@ -0,0 +1,115 @@
+# -*- coding:utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+"""
+Tests for `asyncio_model` module, python 3.6+ only.
+"""
+import datetime
+import sys
+import unittest
+
+from bson.objectid import ObjectId
+from pymongo import MongoClient
+from tests.util import fake_ids, fake_ids_2
+
+if sys.version_info >= (3, 6):
+    import asyncio
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from turbo_motor.asyncio_model import AsyncBaseModel
+
+    class Tag(AsyncBaseModel):
+
+        name = 'turbo_motor_tag'
+        field = {
+            'list': (list, []),
+            'imgid': (ObjectId, None),
+            'uid': (ObjectId, None),
+            'name': (str, None),
+            'value': (int, 0),
+            'atime': (datetime.datetime, None),
+            'up': (dict, {}),
+        }
+
+
+@unittest.skipIf(sys.version_info < (3, 6), 'asyncio model needs python 3.6+')
+class AsyncBaseModelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        db = {
+            'db': {'test': AsyncIOMotorClient(io_loop=self.loop)['test']},
+            'db_file': {'test': None}
+        }
+        self.tb_tag = Tag('test', db)
+        tb_tag = MongoClient()['test']['turbo_motor_tag']
+        for i in fake_ids:
+            tb_tag.insert_one({'_id': i})
+
+    def tearDown(self):
+        tb_tag = MongoClient()['test']['turbo_motor_tag']
+        for i in fake_ids + fake_ids_2:
+            tb_tag.delete_one({'_id': i})
+        self.loop.close()
+
+    def run_sync(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_insert_find(self):
+        _id = self.run_sync(self.tb_tag.insert({'_id': fake_ids_2[0]}))
+        self.assertEqual(_id, fake_ids_2[0])
+        result = self.run_sync(self.tb_tag.find_by_id(fake_ids_2[0]))
+        self.assertEqual(result['value'], 0)
+
+        with self.assertRaises(Exception):
+            self.run_sync(self.tb_tag.insert({'nokey': 10}))
+
+        result = self.run_sync(self.tb_tag.find_one({'_id': fake_ids_2[0]}, wrapper=True))
+        self.assertEqual(result['nokey'], None)
+
+    def test_find_many(self):
+        result = self.run_sync(self.tb_tag.find_many({'_id': {'$in': fake_ids}}, limit=10, batch_size=3))
+        self.assertEqual(len(result), 10)
+
+        result = self.run_sync(self.tb_tag.find_by_id(fake_ids[0:10]))
+        self.assertEqual(len(result), 10)
+
+    def test_iter_many(self):
+        stream = self.tb_tag.iter_many({'_id': {'$in': fake_ids}}, batch_size=10)
+        result = []
+
+        def drain():
+            return self.loop.run_until_complete(stream.__anext__())
+
+        while True:
+            try:
+                result.append(drain())
+            except StopAsyncIteration:
+                break
+        self.assertEqual(len(result), len(fake_ids))
+
+    def test_update_remove(self):
+        with self.assertRaises(ValueError):
+            self.run_sync(self.tb_tag.update({}, {'hello': 0}))
+
+        self.run_sync(self.tb_tag.update({'_id': fake_ids[0]}, {'$set': {'value': 11}}))
+        self.run_sync(self.tb_tag.inc({'_id': fake_ids[0]}, 'value'))
+        result = self.run_sync(self.tb_tag.find_by_id(fake_ids[0]))
+        self.assertEqual(result['value'], 12)
+
+        with self.assertRaises(ValueError):
+            self.run_sync(self.tb_tag.remove({}))
+
+        result = self.run_sync(self.tb_tag.remove_by_id(fake_ids[0:10]))
+        self.assertEqual(result.deleted_count, 10)
+
+    def test_get_as_dict(self):
+        as_dict = self.run_sync(self.tb_tag.get_as_dict({'_id': {'$in': fake_ids[0:10]}}, result='dict'))
+        self.assertEqual(set(as_dict.keys()), set(fake_ids[0:10]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# -*- coding:utf-8 -*-
+"""
+benchmark per call overhead of gen.coroutine model and async def model
+
+    python -m tests.bench_asyncio
+
+find_by_id(None) returns without any io, so it measures the pure
+coroutine cost, find_by_id(_id) adds one round-trip to a local mongodb
+"""
+import asyncio
+import time
+
+from bson.objectid import ObjectId
+from pymongo import MongoClient
+from tornado.ioloop import IOLoop
+import motor
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from turbo_motor.asyncio_model import AsyncBaseModel
+from turbo_motor.model import BaseModel
+
+N = 10000
+FIELD = {'value': (int, 0)}
+
+
+class Tag(BaseModel):
+    name = 'turbo_motor_bench'
+    field = FIELD
+
+
+class AsyncTag(AsyncBaseModel):
+    name = 'turbo_motor_bench'
+    field = FIELD
+
+
+def mapping(client):
+    return {'db': {'test': client['test']}, 'db_file': {'test': None}}
+
+
+def report(name, cost):
+    print('%-30s %8.3fs %8.2fus/call' % (name, cost, cost / N * 1e6))
+
+
+def bench_tornado(_id):
+    model = Tag('test', mapping(motor.MotorClient()))
+
+    async def run(arg):
+        start = time.time()
+        for i in range(N):
+            await model.find_by_id(arg)
+        return time.time() - start
+
+    loop = IOLoop.current()
+    report('gen.coroutine no io', loop.run_sync(lambda: run(None)))
+    report('gen.coroutine find_by_id', loop.run_sync(lambda: run(_id)))
+
+
+def bench_asyncio(_id):
+    loop = asyncio.get_event_loop()
+    model = AsyncTag('test', mapping(AsyncIOMotorClient(io_loop=loop)))
+
+    async def run(arg):
+        start = time.time()
+        for i in range(N):
+            await model.find_by_id(arg)
+        return time.time() - start
+
+    report('async def no io', loop.run_until_complete(run(None)))
+    report('async def find_by_id', loop.run_until_complete(run(_id)))
+
+
+if __name__ == '__main__':
+    collect = MongoClient()['test']['turbo_motor_bench']
+    _id = collect.insert_one({'_id': ObjectId(), 'value': 0}).inserted_id
+    try:
+        bench_tornado(_id)
+        bench_asyncio(_id)
+    finally:
+        collect.drop()
@@ -0,0 +1,67 @@
+# -*- coding:utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+"""
+benchmark cursor draining of find_many, documents/second
+
+    python -m tests.bench_cursor
+
+needs a local mongodb, uses collection test.turbo_motor_bench
+"""
+import time
+
+from pymongo import MongoClient
+from tornado import gen
+from tornado.ioloop import IOLoop
+import motor
+
+SIZES = (1000, 10000, 100000)
+COLLECTION = 'turbo_motor_bench'
+
+
+def make_data(size):
+    collect = MongoClient()['test'][COLLECTION]
+    collect.drop()
+    collect.insert_many([{'value': i, 'name': 'bench'} for i in range(size)])
+
+
+@gen.coroutine
+def drain_fetch_next(collect, size):
+    """drain like find_many did before, one fetch_next per document
+    """
+    cursor = collect.find(limit=size)
+    result = []
+    while (yield cursor.fetch_next):
+        result.append(cursor.next_object())
+    raise gen.Return(result)
+
+
+@gen.coroutine
+def drain_to_list(collect, size):
+    """drain like find_many does now, one future per server batch
+    """
+    cursor = collect.find(limit=size, batch_size=1000)
+    result = yield cursor.to_list(length=None)
+    raise gen.Return(result)
+
+
+@gen.coroutine
+def bench():
+    collect = motor.MotorClient()['test'][COLLECTION]
+    for size in SIZES:
+        make_data(size)
+        for name, drain in (('fetch_next', drain_fetch_next), ('to_list', drain_to_list)):
+            start = time.time()
+            result = yield drain(collect, size)
+            cost = time.time() - start
+            assert len(result) == size
+            print('%-10s %7d docs %8.3fs %12.0f docs/s' % (name, size, cost, size / cost))
+
+    yield collect.drop()
+
+
+if __name__ == '__main__':
+    IOLoop.current().run_sync(bench)
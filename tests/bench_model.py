@@ -0,0 +1,58 @@
+# -*- coding:utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+"""
+benchmark per request model construction, instances/second of resolving
+the collection through the mapping every time and through the handle
+registry
+
+    python -m tests.bench_model
+
+no mongodb needed, the client never connects
+"""
+import datetime
+import time
+
+from bson.objectid import ObjectId
+from turbo.mongo_model import AbstractModel
+import motor
+
+from turbo_motor.model import BaseModel
+
+SIZE = 100000
+
+
+class Tag(BaseModel):
+
+    name = 'turbo_motor_bench'
+    field = {
+        'uid': (ObjectId, None),
+        'value': (int, 0),
+        'atime': (datetime.datetime, None),
+    }
+
+
+class UnpooledTag(Tag):
+
+    def _init(self, db_name, _mongo_db_mapping):
+        return AbstractModel._init(self, db_name, _mongo_db_mapping)
+
+
+def bench():
+    db = {
+        'db': {'test': motor.MotorClient(connect=False)['test']},
+        'db_file': {'test': None}
+    }
+    for name, model in (('mapping', UnpooledTag), ('registry', Tag)):
+        start = time.time()
+        for i in range(SIZE):
+            model('test', db)
+        cost = time.time() - start
+        print('%-8s %d instances %.3fs %10.0f instances/s' % (name, SIZE, cost, SIZE / cost))
+
+
+if __name__ == '__main__':
+    bench()
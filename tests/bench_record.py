@@ -0,0 +1,68 @@
+# -*- coding:utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+"""
+benchmark wrapping documents in _record and model record_class,
+wrap and field access time and memory of wrapped documents
+
+    python -m tests.bench_record
+
+no mongodb needed, memory is reported on python 3 only
+"""
+import time
+
+from bson.objectid import ObjectId
+from turbo.mongo_model import _record
+
+from turbo_motor.record import make_record_class
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+SIZE = 100000
+FIELD = {
+    'uid': (ObjectId, None),
+    'name': (str, None),
+    'value': (int, 0),
+    'list': (list, []),
+    'up': (dict, {}),
+}
+
+
+def make_docs(size):
+    return [{'_id': ObjectId(), 'uid': ObjectId(), 'name': 'bench', 'value': i} for i in range(size)]
+
+
+def access(records):
+    for r in records:
+        r['name'], r['value'], r['list']
+
+
+def bench():
+    docs = make_docs(SIZE)
+    record = make_record_class('Bench', FIELD)
+    for name, wrap in (('_record', _record), ('record', record)):
+        if tracemalloc:
+            tracemalloc.start()
+        start = time.time()
+        records = [wrap(doc) for doc in docs]
+        wrap_cost = time.time() - start
+        memory = tracemalloc.get_traced_memory()[0] if tracemalloc else 0
+        if tracemalloc:
+            tracemalloc.stop()
+
+        start = time.time()
+        access(records)
+        access_cost = time.time() - start
+        print('%-8s %d docs wrap %.3fs access %.3fs memory %.1fMB' % (
+            name, SIZE, wrap_cost, access_cost, memory / 1024.0 / 1024.0))
+        del records
+
+
+if __name__ == '__main__':
+    bench()
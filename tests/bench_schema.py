@@ -0,0 +1,54 @@
+# -*- coding:utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+"""
+benchmark record validation of insert paths, records/second of
+AbstractModel._valid_record and compiled model schema
+
+    python -m tests.bench_schema
+
+no mongodb needed
+"""
+import datetime
+import time
+
+from bson.objectid import ObjectId
+from turbo.mongo_model import AbstractModel
+
+from turbo_motor.schema import get_schema
+
+SIZE = 100000
+
+
+class Bench(AbstractModel):
+
+    name = 'turbo_motor_bench'
+    field = dict([('field%d' % i, (int, 0)) for i in range(20)] + [
+        ('uid', (ObjectId, None)),
+        ('atime', (datetime.datetime, None)),
+    ])
+
+
+def bench():
+    model = Bench()
+    schema = get_schema(Bench)
+    for fill in ('partial', 'full'):
+        for name, valid in (
+                ('interpret', lambda r: AbstractModel._valid_record(model, r)),
+                ('compiled', lambda r: schema.validate(model, r))):
+            if fill == 'full':
+                records = [dict((k, 1) for k in Bench.field) for i in range(SIZE)]
+            else:
+                records = [{'uid': ObjectId(), 'field1': i} for i in range(SIZE)]
+            start = time.time()
+            for r in records:
+                valid(r)
+            cost = time.time() - start
+            print('%-8s %-10s %d records %.3fs %10.0f records/s' % (fill, name, SIZE, cost, SIZE / cost))
+
+
+if __name__ == '__main__':
+    bench()
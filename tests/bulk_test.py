@@ -0,0 +1,62 @@
+# -*- coding:utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+"""
+Tests for `bulk` module.
+"""
+from pymongo.errors import AutoReconnect
+from tornado import gen
+from tornado.testing import gen_test, AsyncTestCase
+
+from turbo_motor.bulk import BulkWriter
+
+
+class FakeModel(object):
+    """first bulk_write fails with a network error, others answer after
+    delay seconds
+    """
+
+    name = 'turbo_motor_bulk'
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self.invalidated = []
+
+    @gen.coroutine
+    def bulk_write(self, ops, ordered=True):
+        self.calls += 1
+        if self.calls == 1:
+            raise AutoReconnect('connection reset')
+        yield gen.sleep(self.delay)
+        raise gen.Return(type(str('Result'), (object,), {'upserted_ids': {}})())
+
+    def _valid_record(self, doc):
+        return doc
+
+    def _valide_update_document(self, document):
+        pass
+
+    def _invalidate(self, filter_):
+        self.invalidated.append(filter_)
+
+
+class BulkWriterTest(AsyncTestCase):
+
+    @gen_test
+    def test_failed_batch(self):
+        model = FakeModel(0.05)
+        writer = BulkWriter(model, max_ops=1, interval=0)
+        failed = writer.inc({'_id': 1}, 'value')
+        written = writer.inc({'_id': 2}, 'value')
+
+        # flush wait for the batch after the failed one
+        yield writer.close()
+        self.assertTrue(written.done())
+        self.assertIsNone(written.result())
+        with self.assertRaises(AutoReconnect):
+            yield failed
+        self.assertEqual(model.invalidated, [{'_id': 1}, {'_id': 2}])
@@ -0,0 +1,111 @@
+# -*- coding:utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+"""
+Tests for `cache` module.
+"""
+import unittest
+
+from bson.son import SON
+
+from turbo_motor.cache import freeze, query_key, LRUCache
+
+
+class FakeTimer(object):
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class LRUCacheTest(unittest.TestCase):
+
+    def test_lru(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        # b is least recently used
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+
+        info = cache.info()
+        self.assertEqual(info['hits'], 3)
+        self.assertEqual(info['misses'], 1)
+        self.assertEqual(info['evictions'], 1)
+        self.assertEqual(info['size'], 2)
+
+    def test_ttl(self):
+        timer = FakeTimer()
+        cache = LRUCache(maxsize=10, ttl=5, timer=timer)
+        cache.set('a', 1)
+        timer.now = 4
+        self.assertEqual(cache.get('a'), 1)
+        timer.now = 5
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.info()['expirations'], 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_invalidate(self):
+        cache = LRUCache(maxsize=10)
+        cache.set(('id1', None), 1, 'id1')
+        cache.set(('id1', (('name', 1),)), 2, 'id1')
+        cache.set(('id2', None), 3, 'id2')
+        cache.invalidate('id1')
+        self.assertIsNone(cache.get(('id1', None)))
+        self.assertIsNone(cache.get(('id1', (('name', 1),))))
+        self.assertEqual(cache.get(('id2', None)), 3)
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_set_since(self):
+        cache = LRUCache(maxsize=2)
+        since = cache.generation
+        cache.invalidate('id1')
+        # read started before invalidation of its tag is dropped
+        cache.set('id1', 1, 'id1', since)
+        self.assertIsNone(cache.get('id1'))
+        cache.set('id2', 2, 'id2', since)
+        self.assertEqual(cache.get('id2'), 2)
+        cache.set('id1', 1, 'id1', cache.generation)
+        self.assertEqual(cache.get('id1'), 1)
+
+        since = cache.generation
+        cache.clear()
+        cache.set('id2', 2, 'id2', since)
+        self.assertEqual(len(cache), 0)
+
+        # trimmed invalidation history refuse every older read
+        since = cache.generation
+        for tag in ('a', 'b', 'c'):
+            cache.invalidate(tag)
+        cache.set('id3', 3, 'id3', since)
+        self.assertEqual(len(cache), 0)
+
+    def test_freeze(self):
+        self.assertEqual(freeze({'b': 1, 'a': [1, {'c': 2}]}), freeze({'a': [1, {'c': 2}], 'b': 1}))
+        self.assertNotEqual(freeze({'a': 1}), freeze({'a': 0}))
+        hash(freeze({'a': [1, 2], 'b': {'c': None}}))
+
+    def test_query_key(self):
+        self.assertIsNone(query_key(None))
+        self.assertEqual(query_key({'a': [1, {'c': 2}]}), query_key({'a': [1, {'c': 2}]}))
+        self.assertNotEqual(query_key({'a': True}), query_key({'a': 1}))
+        self.assertNotEqual(query_key({'a': 1}), query_key({'a': 1.0}))
+        self.assertNotEqual(
+            query_key({'a': SON([('b', 1), ('c', 1)])}),
+            query_key({'a': SON([('c', 1), ('b', 1)])}))
+        self.assertEqual(query_key(['a', 'b']), query_key(('a', 'b')))
+        hash(query_key({'a': [1, 2], 'b': {'c': None}}))
+
+
+if __name__ == '__main__':
+    unittest.main()
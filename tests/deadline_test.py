@@ -0,0 +1,73 @@
+# -*- coding:utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+"""
+Tests for `deadline` module.
+"""
+from pymongo.errors import ExecutionTimeout
+from tornado import gen
+from tornado.ioloop import IOLoop
+from tornado.testing import gen_test, AsyncTestCase
+
+from turbo_motor.deadline import bounded_read, max_time_ms, time_left
+
+
+class DeadlineTest(AsyncTestCase):
+
+    def make_read(self, delays, closed):
+        """read answering after delays[hedge] seconds, failing when negative
+        """
+        @gen.coroutine
+        def answer(hedge):
+            yield gen.sleep(abs(delays[hedge]))
+            if delays[hedge] < 0:
+                raise ValueError('failed')
+            raise gen.Return('hedge' if hedge else 'first')
+
+        def read(hedge):
+            return answer(hedge), lambda: closed.append(hedge)
+        return read
+
+    def test_max_time_ms(self):
+        self.assertEqual(max_time_ms(1.5), 1500)
+        self.assertEqual(max_time_ms(0.0001), 1)
+
+    @gen_test
+    def test_time_left(self):
+        self.assertIsNone(time_left(None))
+        deadline = IOLoop.current().time() + 0.05
+        self.assertLessEqual(time_left(deadline), 0.05)
+        yield gen.sleep(0.06)
+        with self.assertRaises(ExecutionTimeout):
+            time_left(deadline)
+
+    @gen_test
+    def test_bounded_read(self):
+        closed = []
+        result = yield bounded_read(self.make_read({False: 0.01, True: 0}, closed), 1)
+        self.assertEqual(result, 'first')
+
+        # nothing hedged when the first answer comes before hedge_delay
+        result = yield bounded_read(self.make_read({False: 0.01, True: 0}, closed), 1, 0.1)
+        self.assertEqual(result, 'first')
+        self.assertEqual(closed, [])
+
+        # hedge wins and the slow read is cancelled
+        result = yield bounded_read(self.make_read({False: 0.5, True: 0.01}, closed), 1, 0.05)
+        self.assertEqual(result, 'hedge')
+        self.assertEqual(closed, [False])
+
+        # hedge failure fall back to first answer
+        result = yield bounded_read(self.make_read({False: 0.1, True: -0.01}, closed), 1, 0.05)
+        self.assertEqual(result, 'first')
+
+        with self.assertRaises(ValueError):
+            yield bounded_read(self.make_read({False: -0.1, True: -0.01}, closed), 1, 0.05)
+
+        del closed[:]
+        with self.assertRaises(ExecutionTimeout):
+            yield bounded_read(self.make_read({False: 0.5, True: 0.5}, closed), 0.1, 0.05)
+        self.assertEqual(sorted(closed), [False, True])
@@ -0,0 +1,48 @@
+# -*- coding:utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+"""
+Tests for `index` module.
+"""
+import unittest
+
+from pymongo import IndexModel
+
+from turbo_motor.index import diff, to_index_model
+
+
+class IndexTest(unittest.TestCase):
+
+    def test_to_index_model(self):
+        model = to_index_model([('uid', 1)])
+        self.assertEqual(model.document['name'], 'uid_1')
+
+        model = to_index_model({'keys': [('atime', 1)], 'expireAfterSeconds': 60})
+        self.assertEqual(model.document['expireAfterSeconds'], 60)
+
+        model = IndexModel([('uid', 1), ('atime', -1)], unique=True)
+        self.assertIs(to_index_model(model), model)
+
+    def test_diff(self):
+        declared = [
+            to_index_model([('uid', 1)]),
+            to_index_model({'keys': [('atime', 1)], 'expireAfterSeconds': 60}),
+            to_index_model({'keys': [('name', 1)], 'unique': True}),
+        ]
+        information = {
+            '_id_': {'key': [('_id', 1)]},
+            'uid_1': {'key': [('uid', 1)]},
+            'atime_1': {'key': [('atime', 1)], 'expireAfterSeconds': 30},
+            'value_-1': {'key': [('value', -1)]},
+        }
+        missing, different, undeclared = diff(declared, information)
+        self.assertEqual([m.document['name'] for m in missing], ['name_1'])
+        self.assertEqual([name for m, name in different], ['atime_1'])
+        self.assertEqual(undeclared, ['value_-1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
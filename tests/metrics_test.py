@@ -0,0 +1,47 @@
+# -*- coding:utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+"""
+Tests for `metrics` module.
+"""
+import unittest
+
+from pymongo.results import DeleteResult, UpdateResult
+
+from turbo_motor.metrics import count_result, HistogramSink, OperationEvent
+
+
+class MetricsTest(unittest.TestCase):
+
+    def test_count_result(self):
+        self.assertEqual(count_result(None), 0)
+        self.assertEqual(count_result([{}, {}]), 2)
+        self.assertEqual(count_result({'_id': 1}), 1)
+        self.assertEqual(count_result(UpdateResult({'n': 3, 'nModified': 2}, True)), 3)
+        self.assertEqual(count_result(DeleteResult({'n': 4}, True)), 4)
+
+    def test_histogram_sink(self):
+        sink = HistogramSink(reservoir=100)
+        for i in range(200):
+            sink(OperationEvent('tag', 'find_one', i / 1000.0, 1, None, None))
+        sink(OperationEvent('tag', 'insert', 0.5, 0, None, ValueError()))
+
+        result = sink.percentiles('tag', 'find_one')
+        self.assertEqual(result['count'], 200)
+        self.assertEqual(result['documents'], 200)
+        # only latest 100 durations kept
+        self.assertAlmostEqual(result['p50'], 0.15, places=2)
+        self.assertAlmostEqual(result['p99'], 0.198, places=3)
+        self.assertEqual(sink.percentiles('tag', 'insert')['errors'], 1)
+        self.assertIsNone(sink.percentiles('tag', 'update'))
+
+        self.assertEqual(len(sink.summary()), 2)
+        sink.reset()
+        self.assertEqual(sink.summary(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,19 +11,35 @@ test_turbo_motor
 Tests for `model` module.
 """
 import datetime
+import gc
+import json
+import logging
 import os
 import unittest
+import weakref
 
 from bson.objectid import ObjectId
 from pymongo import (
     results as mongo_results,
     MongoClient
 )
+from pymongo.errors import ExecutionTimeout
+from pymongo.read_preferences import ReadPreference
+from tornado import gen
 from tornado.testing import gen_test, AsyncTestCase
 import motor
+from turbo_motor.metrics import add_sink, remove_sink, HistogramSink
 from turbo_motor.model import BaseModel
+from turbo_motor.raw import is_raw, to_json
+from turbo_motor.record import BaseRecord
+from turbo_motor import slowlog
 from tests.util import fake_ids, fake_ids_2
 
+try:
+    basestring
+except NameError:
+    basestring = str
+
 os.environ['ASYNC_TEST_TIMEOUT'] = '10'
 
 
@@ -44,6 +60,48 @@ class Tag(BaseModel):
         pass
 
 
+class CoalescedTag(Tag):
+
+    coalesce_reads = True
+
+
+class SlowTag(Tag):
+
+    slow_query_threshold = 0
+    slow_query_explain = True
+
+
+class IndexedTag(Tag):
+
+    index = [
+        [('uid', 1), ('value', -1)],
+        {'keys': [('imgid', 1)], 'sparse': True},
+    ]
+
+
+class SecondaryTag(Tag):
+
+    read_preference = 'secondaryPreferred'
+    read_your_writes = 5
+
+
+class HedgedTag(Tag):
+
+    read_timeout = 5
+    hedge_delay = 0
+
+
+class CachedTag(Tag):
+
+    cache_size = 10
+    cache_ttl = 60
+
+
+class CachedSecondaryTag(CachedTag):
+
+    read_preference = 'secondaryPreferred'
+
+
 class BaseModelTest(AsyncTestCase):
 
     def setUp(self):
@@ -197,6 +255,29 @@ class BaseModelTest(AsyncTestCase):
         for i in result.inserted_ids:
             self.assertIn(i, fake_ids_2)
 
+    @gen_test
+    def test_import_many(self):
+        docs = ({'_id': i, 'value': index} for index, i in enumerate(fake_ids_2))
+        events = []
+        add_sink(events.append)
+        try:
+            result = yield self.tb_tag.import_many(docs, chunk_size=1, concurrency=2)
+        finally:
+            remove_sink(events.append)
+        # batches are not reported again as insert_many
+        self.assertEqual([(e.operation, e.count) for e in events], [('import_many', len(fake_ids_2))])
+        self.assertEqual(result.inserted_ids, fake_ids_2)
+        self.assertEqual(result.errors, [])
+        result = yield self.tb_tag.find_by_id(fake_ids_2[1])
+        self.assertEqual(result['value'], 1)
+
+        # invalid chunk and duplicate key are reported per chunk
+        docs = [{'_id': fake_ids_2[0]}, {'nokey': 1}, {'value': 3}]
+        result = yield self.tb_tag.import_many(docs, chunk_size=2)
+        self.assertEqual(len(result.inserted_ids), 1)
+        self.assertEqual([i[0] for i in result.errors], [0])
+        yield self.tb_tag.remove_by_id(result.inserted_ids)
+
     @gen_test
     def test_find_one(self):
         result = yield self.tb_tag.find_one()
@@ -230,6 +311,32 @@ class BaseModelTest(AsyncTestCase):
         for i in result:
             self.assertEqual(i['nokey'], None)
 
+        # small server batches are drained completely
+        result = yield self.tb_tag.find_many(limit=30, batch_size=7)
+        self.assertEqual(len(result), 30)
+
+    @gen_test
+    def test_iter_many(self):
+        stream = self.tb_tag.iter_many({'_id': {'$in': fake_ids}}, batch_size=10)
+        result = []
+        while (yield stream.fetch_next):
+            result.append(stream.next_object())
+        self.assertEqual(len(result), len(fake_ids))
+        self.assertFalse(stream.alive)
+
+        # batch by batch with wrapper
+        stream = self.tb_tag.iter_many({'_id': {'$in': fake_ids}}, batch_size=10, wrapper=True)
+        batch = yield stream.next_batch()
+        self.assertEqual(len(batch), 10)
+        for i in batch:
+            self.assertEqual(i['nokey'], None)
+
+        # stop early
+        yield stream.close()
+        self.assertFalse(stream.alive)
+        batch = yield stream.next_batch()
+        self.assertEqual(batch, [])
+
     @gen_test
     def test_update_one(self):
         with self.assertRaises(ValueError):
@@ -267,6 +374,17 @@ class BaseModelTest(AsyncTestCase):
         for index, i in enumerate(result):
             self.assertEqual(i['_id'], fake_ids[0:10][index])
 
+        # aligned with input order in chunks
+        ids = list(reversed(fake_ids[0:10])) + [fake_ids_2[0]]
+        result = yield self.tb_tag.find_by_id(ids, ordered=True, chunk_size=3, concurrency=2)
+        self.assertEqual(len(result), 11)
+        for index, i in enumerate(result[:10]):
+            self.assertEqual(i['_id'], ids[index])
+        self.assertIsNone(result[10])
+
+        result = yield self.tb_tag.find_by_id(ids, as_dict=True, chunk_size=4)
+        self.assertEqual(set(result.keys()), set(fake_ids[0:10]))
+
     @gen_test
     def test_remove_by_id(self):
         result = yield self.tb_tag.remove_by_id(fake_ids[0])
@@ -281,6 +399,20 @@ class BaseModelTest(AsyncTestCase):
         yield self.tb_tag.inc({'_id': _id}, 'value')
         result = yield self.tb_tag.find_by_id(_id)
         self.assertEqual(result['value'], 11)
+
+        # buffered
+        for i in range(10):
+            yield self.tb_tag.inc({'_id': _id}, 'value', buffered=True)
+        yield self.tb_tag.inc({'_id': _id}, 'hits', 2, buffered=True)
+        self.assertEqual(self.tb_tag.pending_inc({'_id': _id}, 'value'), 10)
+        result = yield self.tb_tag.find_by_id(_id)
+        self.assertEqual(result['value'], 11)
+
+        yield self.tb_tag.flush_inc()
+        self.assertEqual(self.tb_tag.pending_inc({'_id': _id}, 'value'), 0)
+        result = yield self.tb_tag.find_by_id(_id)
+        self.assertEqual(result['value'], 21)
+        self.assertEqual(result['hits'], 2)
         yield self.tb_tag.remove_by_id(_id)
 
     @gen_test
@@ -301,6 +433,489 @@ class BaseModelTest(AsyncTestCase):
         for i in as_list:
             self.assertIn(i['_id'], fake_ids[0:10])
 
+        # only one of dict or list
+        as_dict = yield self.tb_tag.get_as_dict({'_id': {'$in': fake_ids[0:10]}}, result='dict')
+        self.assertEqual(set(as_dict.keys()), set(fake_ids[0:10]))
+        as_list = yield self.tb_tag.get_as_dict({'_id': {'$in': fake_ids[0:10]}}, result='list')
+        self.assertEqual(len(as_list), 10)
+
+        # key by other field, key always projected
+        yield self.tb_tag.update({'_id': fake_ids[0]}, {'$set': {'name': 'tag0', 'value': 3}})
+        as_dict = yield self.tb_tag.get_as_dict({'_id': fake_ids[0]}, {'value': 1}, key='name', result='dict')
+        self.assertEqual(as_dict['tag0']['value'], 3)
+
+        # cap documents
+        with self.assertRaises(ValueError):
+            yield self.tb_tag.get_as_dict({'_id': {'$in': fake_ids[0:10]}}, max_size=5, batch_size=2)
+        as_list = yield self.tb_tag.get_as_dict({'_id': {'$in': fake_ids[0:10]}}, max_size=10, result='list')
+        self.assertEqual(len(as_list), 10)
+
+    @gen_test
+    def test_cache(self):
+        db = {
+            'db': {'test': self.mc['test']},
+            'db_file': {'test': None}
+        }
+        tb_tag = CachedTag('test', db)
+        tb_tag.cache_clear()
+        self.assertIsNone(self.tb_tag.cache_info())
+        base = tb_tag.cache_info()
+
+        result = yield tb_tag.find_by_id(fake_ids[0])
+        self.assertEqual(result['_id'], fake_ids[0])
+        result = yield tb_tag.find_one({'_id': fake_ids[0]})
+        self.assertEqual(result['_id'], fake_ids[0])
+        info = tb_tag.cache_info()
+        self.assertEqual(info['misses'] - base['misses'], 1)
+        self.assertEqual(info['hits'] - base['hits'], 1)
+
+        # projection is part of the key
+        result = yield tb_tag.find_by_id(fake_ids[0], {'value': 1})
+        self.assertEqual(tb_tag.cache_info()['misses'] - base['misses'], 2)
+
+        # cache shared by instances, invalidated by write
+        other = CachedTag('test', db)
+        yield other.update_one({'_id': fake_ids[0]}, {'$set': {'value': 7}})
+        result = yield tb_tag.find_by_id(fake_ids[0])
+        self.assertEqual(result['value'], 7)
+
+        yield other.inc({'_id': fake_ids[0]}, 'value')
+        result = yield tb_tag.find_by_id(fake_ids[0])
+        self.assertEqual(result['value'], 8)
+
+        # list of ids partly served from cache
+        result = yield tb_tag.find_by_id(fake_ids[0:20])
+        self.assertEqual(len(result), 20)
+        self.assertEqual(tb_tag.cache_info()['evictions'] - base['evictions'], 10)
+
+        yield other.remove_by_id(fake_ids[19])
+        result = yield tb_tag.find_by_id(fake_ids[19])
+        self.assertIsNone(result)
+
+        # read in flight while a write invalidates does not refill the cache
+        tb_tag.cache_clear()
+        read = tb_tag.find_by_id(fake_ids[1])
+        yield other.update_one({'_id': fake_ids[1]}, {'$set': {'value': 9}})
+        yield read
+        result = yield tb_tag.find_by_id(fake_ids[1])
+        self.assertEqual(result['value'], 9)
+
+        # same collection name through another client is another cache
+        db_2 = {
+            'db': {'test': motor.MotorClient()['test']},
+            'db_file': {'test': None}
+        }
+        self.assertEqual(CachedTag('test', db_2).cache_info()['size'], 0)
+        tb_tag.cache_clear()
+
+        # caches are freed with their database, a collection reusing the id
+        # of a freed one never sees its documents
+        for i in range(50):
+            model = CachedTag('test', {
+                'db': {'test': motor.MotorClient(connect=False)['test_%s' % i]},
+                'db_file': {'test': None}
+            })
+            self.assertEqual(model.cache_info()['size'], 0)
+            model._BaseBaseModel__cache.set(('x', None), {'_id': 'x'}, 'x')
+            del model
+            gc.collect()
+
+    @gen_test
+    def test_coalesce_reads(self):
+        db = {
+            'db': {'test': self.mc['test']},
+            'db_file': {'test': None}
+        }
+        tb_tag = CoalescedTag('test', db)
+        futures = [tb_tag.find_by_id(fake_ids[0]) for i in range(10)]
+        futures.append(tb_tag.find_one({'_id': fake_ids[0]}))
+        result = yield futures
+        for i in result:
+            self.assertEqual(i['_id'], fake_ids[0])
+
+        # every caller get its own document
+        result[0]['value'] = 100
+        self.assertNotEqual(result[1].get('value'), 100)
+
+        result = yield tb_tag.find_by_id(fake_ids_2[0])
+        self.assertIsNone(result)
+
+    @gen_test
+    def test_load_by_id(self):
+        ids = [fake_ids[0], fake_ids_2[0], fake_ids[1], fake_ids[0]]
+        result = yield [self.tb_tag.load_by_id(i) for i in ids]
+        self.assertEqual(result[0]['_id'], fake_ids[0])
+        self.assertIsNone(result[1])
+        self.assertEqual(result[2]['_id'], fake_ids[1])
+        self.assertEqual(result[3]['_id'], fake_ids[0])
+        self.assertIsNot(result[0], result[3])
+
+        result = yield self.tb_tag.load_by_id(fake_ids[0:5], {'value': 1})
+        self.assertEqual([i['_id'] for i in result], fake_ids[0:5])
+
+    @gen_test
+    def test_bulk_writer(self):
+        writer = self.tb_tag.bulk_writer(max_ops=3, interval=0.1)
+        insert = writer.insert({'_id': fake_ids_2[0], 'value': 1})
+        update = writer.update_one({'_id': fake_ids[0]}, {'$set': {'value': 5}})
+        self.assertEqual(len(writer), 2)
+
+        # third operation reach max_ops
+        inc = writer.inc({'_id': fake_ids[0]}, 'value', 2)
+        result = yield [insert, update, inc]
+        self.assertEqual(result, [fake_ids_2[0], None, None])
+        result = yield self.tb_tag.find_by_id(fake_ids[0])
+        self.assertEqual(result['value'], 7)
+
+        # per operation error
+        with self.assertRaises(ValueError):
+            writer.update_one({'_id': fake_ids[0]}, {'value': 1})
+        duplicate = writer.insert({'_id': fake_ids_2[0]})
+        delete = writer.delete_one({'_id': fake_ids[1]})
+        yield writer.flush()
+        with self.assertRaises(Exception):
+            yield duplicate
+        yield delete
+        result = yield self.tb_tag.find_by_id(fake_ids[1])
+        self.assertIsNone(result)
+
+        # flush wait for batches already in flight
+        for i in range(3):
+            inc = writer.inc({'_id': fake_ids[0]}, 'value')
+        self.assertEqual(len(writer), 0)
+        yield writer.flush()
+        self.assertTrue(inc.done())
+
+        # interval flush and close
+        insert = writer.insert({'_id': fake_ids_2[1]})
+        _id = yield insert
+        self.assertEqual(_id, fake_ids_2[1])
+        yield writer.close()
+        with self.assertRaises(ValueError):
+            writer.inc({'_id': fake_ids[0]}, 'value')
+
+    @gen_test
+    def test_instrument(self):
+        sink = HistogramSink()
+        events = []
+        add_sink(sink)
+        add_sink(events.append)
+        try:
+            yield self.tb_tag.find_many({'_id': {'$in': fake_ids[0:5]}}, limit=5)
+            yield self.tb_tag.get_as_dict({'_id': {'$in': fake_ids[0:5]}})
+            # reported once, not again as find_many
+            yield self.tb_tag.find_by_id(fake_ids[0:5])
+            yield self.tb_tag.update_many({'_id': {'$in': fake_ids[0:5]}}, {'$set': {'value': 1}})
+            with self.assertRaises(ValueError):
+                yield self.tb_tag.remove({})
+        finally:
+            remove_sink(sink)
+            remove_sink(events.append)
+
+        self.assertEqual([(e.collection, e.operation, e.count) for e in events], [
+            ('turbo_motor_tag', 'find_many', 5),
+            ('turbo_motor_tag', 'get_as_dict', 5),
+            ('turbo_motor_tag', 'find_by_id', 5),
+            ('turbo_motor_tag', 'update_many', 5),
+            ('turbo_motor_tag', 'remove', 0),
+        ])
+        self.assertIsInstance(events[-1].error, ValueError)
+        self.assertEqual(sink.percentiles('turbo_motor_tag', 'find_many')['count'], 1)
+
+        # disabled
+        yield self.tb_tag.find_one()
+        self.assertEqual(len(events), 5)
+
+    @gen_test
+    def test_slow_query(self):
+        db = {
+            'db': {'test': self.mc['test']},
+            'db_file': {'test': None}
+        }
+        tb_tag = SlowTag('test', db)
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        slowlog.model_log.addHandler(handler)
+        try:
+            yield tb_tag.find_many({'value': {'$gt': 10}}, {'value': 1}, limit=3)
+            # same shape is rate limited
+            yield tb_tag.find_many({'value': {'$gt': 11}}, {'value': 1}, limit=3)
+            yield gen.sleep(0.2)
+        finally:
+            slowlog.model_log.removeHandler(handler)
+
+        messages = [r.getMessage() for r in records]
+        self.assertEqual(len(messages), 2)
+        self.assertIn('slow turbo_motor_tag.find_many', messages[0])
+        self.assertIn("'$gt': '?'", messages[0])
+        self.assertIn('plan', messages[1])
+
+    @gen_test
+    def test_sync_indexes(self):
+        db = {
+            'db': {'test': self.mc['test']},
+            'db_file': {'test': None}
+        }
+        tb_tag = IndexedTag('test', db)
+        try:
+            report = yield tb_tag.sync_indexes(create=False)
+            self.assertEqual(sorted(report['missing']), ['imgid_1', 'uid_1_value_-1'])
+            self.assertEqual(report['created'], [])
+
+            report = yield tb_tag.sync_indexes()
+            self.assertEqual(sorted(report['created']), ['imgid_1', 'uid_1_value_-1'])
+
+            report = yield tb_tag.sync_indexes()
+            self.assertEqual(report['created'], [])
+            self.assertEqual(report['missing'], [])
+            self.assertNotIn('uid_1_value_-1', report['undeclared'])
+        finally:
+            yield self.tb_tag.drop_index('uid_1_value_-1')
+            yield self.tb_tag.drop_index('imgid_1')
+
+    @gen_test
+    def test_find_page(self):
+        ids = sorted(fake_ids, reverse=True)
+        filter_ = {'_id': {'$in': fake_ids}}
+        docs, token = yield self.tb_tag.find_page(filter_, limit=20)
+        self.assertEqual([i['_id'] for i in docs], ids[0:20])
+        docs, token = yield self.tb_tag.find_page(filter_, limit=20, token=token)
+        self.assertEqual([i['_id'] for i in docs], ids[20:40])
+        docs, token = yield self.tb_tag.find_page(filter_, limit=20, token=token, wrapper=True)
+        self.assertEqual([i['_id'] for i in docs], ids[40:])
+        self.assertIsNone(token)
+        self.assertEqual(docs[0]['nokey'], None)
+
+        # compound sort with tie-breaker
+        yield self.tb_tag.update_many(filter_, {'$set': {'value': 0}})
+        yield self.tb_tag.update_many({'_id': {'$in': fake_ids[0:5]}}, {'$set': {'value': 1}})
+        result, token = [], None
+        while True:
+            docs, token = yield self.tb_tag.find_page(
+                filter_, {'value': 1}, sort=[('value', -1)], limit=3, token=token)
+            result.extend(docs)
+            if token is None:
+                break
+        self.assertEqual([i['_id'] for i in result[0:5]], sorted(fake_ids[0:5], reverse=True))
+        self.assertEqual(len(result), len(fake_ids))
+
+    @gen_test
+    def test_record_class(self):
+        record = Tag.record_class()
+        self.assertIs(record, self.tb_tag.record_class())
+        self.assertIsNot(record, CachedTag.record_class())
+
+        docs = yield self.tb_tag.find_many({'_id': {'$in': fake_ids[0:5]}}, {'_id': 1}, limit=5, wrapper='record')
+        self.assertEqual(len(docs), 5)
+        self.assertIsInstance(docs[0], BaseRecord)
+        self.assertIs(type(docs[0]), Tag.record_class({'_id': 1}))
+        self.assertIsNone(docs[0].value)
+        self.assertIsNone(docs[0]['nokey'])
+        docs = yield self.tb_tag.find_many({'_id': {'$in': fake_ids[0:5]}}, limit=5, wrapper='record')
+        self.assertIsInstance(docs[0], record)
+
+        result = yield self.tb_tag.find_one({'_id': fake_ids[0]}, wrapper=record)
+        self.assertEqual(result._id, fake_ids[0])
+        result = yield self.tb_tag.find_one({'_id': ObjectId()}, wrapper='record')
+        self.assertIsNone(result)
+
+    @gen_test
+    def test_raw(self):
+        doc = yield self.tb_tag.find_one({'_id': fake_ids[0]}, raw=True)
+        self.assertTrue(is_raw(doc))
+        self.assertEqual(doc['_id'], fake_ids[0])
+
+        docs = yield self.tb_tag.find_many({'_id': {'$in': fake_ids[0:5]}}, limit=5, raw=True)
+        self.assertEqual(len(docs), 5)
+        self.assertTrue(all(is_raw(i) for i in docs))
+        self.assertEqual(len(json.loads(to_json(docs))), 5)
+
+        docs = yield self.tb_tag.find_by_id(fake_ids[0:5], ordered=True, raw=True)
+        self.assertEqual([i['_id'] for i in docs], fake_ids[0:5])
+        doc = yield self.tb_tag.find_by_id(fake_ids[0], raw=True)
+        self.assertTrue(is_raw(doc))
+
+        as_dict = yield self.tb_tag.get_as_dict({'_id': {'$in': fake_ids[0:5]}}, result='dict', raw=True)
+        self.assertEqual(sorted(as_dict), sorted(fake_ids[0:5]))
+
+        # raw reads do not fill the cache
+        db = {
+            'db': {'test': self.mc['test']},
+            'db_file': {'test': None}
+        }
+        tb_tag = CachedTag('test', db)
+        tb_tag.cache_clear()
+        yield tb_tag.find_by_id(fake_ids[0], raw=True)
+        self.assertEqual(tb_tag.cache_info()['size'], 0)
+
+    @gen_test
+    def test_getattr(self):
+        self.assertNotIn('count', self.tb_tag.__dict__)
+        count = yield self.tb_tag.count({'_id': {'$in': fake_ids}})
+        self.assertEqual(count, len(fake_ids))
+        self.assertIn('count', self.tb_tag.__dict__)
+        count = yield self.tb_tag.count({'_id': {'$in': fake_ids}})
+        self.assertEqual(count, len(fake_ids))
+
+        with self.assertRaises(AttributeError):
+            self.tb_tag.nosuchattr
+        self.assertNotIn('nosuchattr', self.tb_tag.__dict__)
+        self.assertEqual(self.tb_tag.sub_collection('sub').name, 'turbo_motor_tag.sub')
+
+    @gen_test
+    def test_init(self):
+        db = {
+            'db': {'test': self.mc['test']},
+            'db_file': {'test': None}
+        }
+        first, second = Tag('test', db), Tag('test', db)
+        first_collect = first._BaseBaseModel__collect
+        second_collect = second._BaseBaseModel__collect
+        self.assertIsNot(first_collect, second_collect)
+        self.assertIs(first_collect._collect, second_collect._collect)
+        self.assertIs(second_collect._model_ins, second)
+        self.assertIsNot(CachedTag('test', db)._BaseBaseModel__collect._collect, first_collect._collect)
+
+        result = yield second.find_by_id(fake_ids[0])
+        self.assertEqual(result['_id'], fake_ids[0])
+
+        with self.assertRaises(Exception):
+            Tag('nodb', db)
+
+        # resolved collections are freed with their database
+        db = {
+            'db': {'test': motor.MotorClient()['test']},
+            'db_file': {'test': None}
+        }
+        first = Tag('test', db)
+        database = weakref.ref(db['db']['test'])
+        del first, db
+        gc.collect()
+        self.assertIsNone(database())
+
+    @gen_test
+    def test_read_preference(self):
+        db = {
+            'db': {'test': self.mc['test']},
+            'db_file': {'test': None}
+        }
+        tb_tag = SecondaryTag('test', db)
+        self.assertEqual(tb_tag._reader()._collect.read_preference, ReadPreference.SECONDARY_PREFERRED)
+        self.assertIs(tb_tag._reader(), tb_tag._reader())
+        self.assertEqual(
+            tb_tag._reader(read_preference='nearest')._collect.read_preference, ReadPreference.NEAREST)
+        self.assertIs(self.tb_tag._reader(), self.tb_tag._BaseBaseModel__collect)
+
+        result = yield tb_tag.find_by_id(fake_ids[0])
+        self.assertEqual(result['_id'], fake_ids[0])
+        result = yield tb_tag.find_many({'_id': {'$in': fake_ids[0:5]}}, limit=5, read_preference='primary')
+        self.assertEqual(len(result), 5)
+        result = yield tb_tag.get_as_dict({'_id': {'$in': fake_ids[0:5]}}, result='dict', read_preference='nearest')
+        self.assertEqual(len(result), 5)
+
+        # reads go to primary after a write of the same instance
+        yield tb_tag.update_one({'_id': fake_ids[0]}, {'$set': {'value': 1}})
+        self.assertEqual(tb_tag._reader()._collect.read_preference, ReadPreference.PRIMARY)
+        self.assertEqual(
+            tb_tag._reader(read_preference='nearest')._collect.read_preference, ReadPreference.PRIMARY)
+        result = yield tb_tag.find_by_id(fake_ids[0])
+        self.assertEqual(result['value'], 1)
+
+        other = SecondaryTag('test', db)
+        self.assertEqual(other._reader()._collect.read_preference, ReadPreference.SECONDARY_PREFERRED)
+
+        # cache misses are read from primary
+        cached = CachedSecondaryTag('test', db)
+        cached.cache_clear()
+        result = yield cached.find_by_id(fake_ids[0:2])
+        self.assertEqual(len(result), 2)
+        result = yield cached.find_by_id(fake_ids[2])
+        self.assertEqual(result['_id'], fake_ids[2])
+        readers = cached._BaseBaseModel__readers
+        self.assertEqual(list(readers), [(False, 'primary')])
+        self.assertEqual(readers[(False, 'primary')]._collect.read_preference, ReadPreference.PRIMARY)
+        cached.cache_clear()
+
+    @gen_test
+    def test_read_timeout(self):
+        db = {
+            'db': {'test': self.mc['test']},
+            'db_file': {'test': None}
+        }
+        tb_tag = HedgedTag('test', db)
+        result = yield tb_tag.find_by_id(fake_ids[0:5])
+        self.assertEqual(len(result), 5)
+        result = yield tb_tag.find_by_id(fake_ids[0])
+        self.assertEqual(result['_id'], fake_ids[0])
+        result = yield tb_tag.find_one({'_id': fake_ids[0]}, raw=True)
+        self.assertEqual(result['_id'], fake_ids[0])
+
+        slow = {'_id': {'$in': fake_ids[0:5]}, '$where': 'sleep(100) || true'}
+        with self.assertRaises(ExecutionTimeout):
+            yield self.tb_tag.find_many(slow, limit=5, timeout=0.05)
+        with self.assertRaises(ExecutionTimeout):
+            yield self.tb_tag.find_one(slow, timeout=0.05)
+
+    @gen_test
+    def test_aggregate(self):
+        filter_ = {'_id': {'$in': fake_ids}}
+        ids = sorted(fake_ids)
+        docs, total = yield self.tb_tag.aggregate_page(
+            filter_, {'_id': 1}, sort=[('_id', 1)], skip=10, limit=5, allow_disk_use=True)
+        self.assertEqual(total, len(fake_ids))
+        self.assertEqual([i['_id'] for i in docs], ids[10:15])
+
+        docs, total = yield self.tb_tag.aggregate_page(
+            filter_, pipeline=[{'$match': {'_id': {'$in': ids[0:3]}}}], wrapper=True)
+        self.assertEqual(total, 3)
+        self.assertEqual(docs[0]['nokey'], None)
+
+        docs, total = yield self.tb_tag.aggregate_page({'_id': ObjectId()})
+        self.assertEqual([docs, total], [[], 0])
+
+        stream = self.tb_tag.iter_aggregate(
+            [{'$match': filter_}, {'$sort': {'_id': 1}}], batch_size=7, wrapper='record')
+        result = []
+        batch = yield stream.next_batch()
+        while batch:
+            self.assertLessEqual(len(batch), 7)
+            result.extend(batch)
+            batch = yield stream.next_batch()
+        self.assertEqual([i._id for i in result], ids)
+
+    @gen_test
+    def test_save_many(self):
+        docs = [
+            {'_id': fake_ids[0], 'value': 5},
+            {'value': 6},
+            {'nokey': 1},
+            {'_id': fake_ids_2[0], 'value': 7},
+        ]
+        result = yield self.tb_tag.save_many(docs, batch_size=2, concurrency=2)
+        self.assertEqual(len(result.ids), 4)
+        self.assertEqual(result.ids[0], fake_ids[0])
+        self.assertIsInstance(result.ids[1], ObjectId)
+        self.assertIsNone(result.ids[2])
+        self.assertEqual(result.ids[3], fake_ids_2[0])
+        self.assertEqual([i for i, e in result.errors], [2])
+
+        found = yield self.tb_tag.find_by_id([result.ids[0], result.ids[1], result.ids[3]], ordered=True)
+        self.assertEqual([i['value'] for i in found], [5, 6, 7])
+        yield self.tb_tag.remove_by_id(result.ids[1])
+
+        # duplicate key is reported for its own document only
+        tb_tag = MongoClient()['test']['turbo_motor_tag']
+        tb_tag.create_index('name', unique=True, sparse=True)
+        try:
+            result = yield self.tb_tag.save_many(
+                [{'_id': fake_ids[1], 'name': 'dup'}, {'_id': fake_ids[2], 'name': 'dup'}], check=False)
+            self.assertEqual(result.ids, [fake_ids[1], None])
+            self.assertEqual(result.errors[0][0], 1)
+            self.assertEqual(result.errors[0][1].code, 11000)
+        finally:
+            tb_tag.drop_index('name_1')
+
     @gen_test
     def test_find_new_one(self):
         result = yield self.tb_tag.find_new_one()
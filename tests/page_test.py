@@ -0,0 +1,46 @@
+# -*- coding:utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+"""
+Tests for `page` module.
+"""
+import datetime
+import unittest
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+from turbo_motor.page import decode_token, encode_token, keyset_filter, normalize_sort
+
+
+class PageTest(unittest.TestCase):
+
+    def test_normalize_sort(self):
+        self.assertEqual(normalize_sort(), [('_id', DESCENDING)])
+        self.assertEqual(normalize_sort('atime'), [('atime', ASCENDING), ('_id', ASCENDING)])
+        self.assertEqual(
+            normalize_sort([('atime', DESCENDING)]), [('atime', DESCENDING), ('_id', DESCENDING)])
+        self.assertEqual(normalize_sort([('_id', ASCENDING)]), [('_id', ASCENDING)])
+
+    def test_token(self):
+        values = [datetime.datetime(2017, 1, 1), ObjectId(), 10]
+        token = encode_token(values)
+        self.assertEqual(decode_token(token, 3), values)
+
+        with self.assertRaises(ValueError):
+            decode_token(token, 2)
+        with self.assertRaises(ValueError):
+            decode_token('not a token', 1)
+
+    def test_keyset_filter(self):
+        self.assertEqual(keyset_filter([('_id', DESCENDING)], [5]), {'_id': {'$lt': 5}})
+        self.assertEqual(keyset_filter([('a', ASCENDING), ('_id', DESCENDING)], [1, 2]), {
+            '$or': [{'a': {'$gt': 1}}, {'a': 1, '_id': {'$lt': 2}}]
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
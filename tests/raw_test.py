@@ -0,0 +1,52 @@
+# -*- coding:utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+"""
+Tests for `raw` module.
+"""
+import datetime
+import json
+import unittest
+
+import bson
+from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
+
+from turbo_motor.raw import decode, is_raw, to_json
+
+
+def raw(doc):
+    return RawBSONDocument(bson.BSON.encode(doc))
+
+
+class RawTest(unittest.TestCase):
+
+    def test_decode(self):
+        doc = {'_id': ObjectId(), 'up': {'a': 1}, 'list': [1, 2]}
+        self.assertTrue(is_raw(raw(doc)))
+        self.assertFalse(is_raw(doc))
+        self.assertEqual(decode(raw(doc)), doc)
+        self.assertIsInstance(decode(raw(doc))['up'], dict)
+
+        docs = [dict(doc, value=i) for i in range(3)]
+        self.assertEqual(decode([raw(d) for d in docs]), docs)
+        self.assertEqual(decode([]), [])
+        self.assertIs(decode(doc), doc)
+
+    def test_to_json(self):
+        _id = ObjectId()
+        atime = datetime.datetime(2017, 1, 1)
+        result = json.loads(to_json([raw({'_id': _id, 'atime': atime, 'name': 'a'})]))
+        self.assertEqual(result[0]['_id'], {'$oid': str(_id)})
+        self.assertIn('$date', result[0]['atime'])
+        self.assertEqual(result[0]['name'], 'a')
+        self.assertEqual(json.loads(to_json({'name': 'b'})), {'name': 'b'})
+        self.assertEqual(json.loads(to_json(raw({'name': 'c'}))), {'name': 'c'})
+        self.assertEqual(json.loads(to_json([raw({'name': 'd'})], sort_keys=True)), [{'name': 'd'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
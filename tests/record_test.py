@@ -0,0 +1,89 @@
+# -*- coding:utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+"""
+Tests for `record` module.
+"""
+import unittest
+
+from turbo_motor.record import BaseRecord, kept_fields, make_record_class
+
+FIELD = {
+    'name': (str, None),
+    'value': (int, 0),
+    'list': (list, []),
+    'items': (list, []),
+    'up-down': (int, 1),
+}
+
+
+class RecordTest(unittest.TestCase):
+
+    def setUp(self):
+        self.Record = make_record_class('Tag', FIELD)
+
+    def test_class(self):
+        self.assertEqual(self.Record.__name__, 'TagRecord')
+        self.assertTrue(issubclass(self.Record, BaseRecord))
+        record = self.Record({})
+        self.assertFalse(hasattr(record, '__dict__'))
+        with self.assertRaises(AttributeError):
+            record.other = 1
+
+    def test_access(self):
+        doc = {'_id': 1, 'name': 'a'}
+        record = self.Record(doc)
+        self.assertEqual(record._id, 1)
+        self.assertEqual(record.name, 'a')
+        self.assertEqual(record['name'], 'a')
+        self.assertEqual(record.value, 0)
+        self.assertEqual(record['value'], 0)
+        self.assertEqual(record['up-down'], 1)
+        self.assertIsNone(record['nokey'])
+        self.assertEqual(record.get('value'), 0)
+        self.assertEqual(record.get('value', 3), 3)
+        self.assertIsNone(record.get('nokey'))
+        self.assertNotIn('value', record)
+        self.assertIs(record.to_dict(), doc)
+        self.assertEqual(record, doc)
+        self.assertEqual(len(record), 2)
+        self.assertEqual(sorted(record), ['_id', 'name'])
+
+        # method name field is item only
+        self.assertTrue(callable(record.items))
+        self.assertEqual(record['items'], [])
+
+        record['value'] = 2
+        self.assertEqual(doc['value'], 2)
+        self.assertEqual(record.value, 2)
+
+    def test_projection(self):
+        self.assertIsNone(kept_fields(FIELD, None))
+        self.assertEqual(kept_fields(FIELD, ['name', 'other']), frozenset(['_id', 'name']))
+        self.assertEqual(kept_fields(FIELD, {'name': 1, '_id': 0}), frozenset(['name']))
+        self.assertEqual(kept_fields(FIELD, {'list.a': 1, 'items': {'$slice': 1}}), frozenset(['_id', 'list']))
+        self.assertEqual(
+            kept_fields(FIELD, {'list': 0, 'items': 0}), frozenset(['_id', 'name', 'value', 'up-down']))
+        self.assertIsNone(kept_fields(FIELD, {'items': {'$slice': 1}}))
+        self.assertEqual(kept_fields(FIELD, {'_id': 1}), frozenset(['_id']))
+        self.assertEqual(kept_fields(FIELD, {'_id': 0}), frozenset(FIELD))
+
+        Record = make_record_class('Tag', FIELD, kept_fields(FIELD, {'_id': 1}))
+        record = Record({'_id': 1})
+        self.assertEqual(record._id, 1)
+        self.assertIsNone(record.value)
+        self.assertIsNone(record['value'])
+        self.assertIsNone(record.get('list'))
+
+    def test_mutable_default(self):
+        first, second = self.Record({}), self.Record({})
+        first.list.append(1)
+        self.assertEqual(second.list, [])
+        self.assertEqual(FIELD['list'][1], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+# -*- coding:utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+"""
+Tests for `routing` module.
+"""
+import unittest
+
+from pymongo.read_preferences import ReadPreference
+
+from turbo_motor.routing import read_preference
+
+
+class RoutingTest(unittest.TestCase):
+
+    def test_read_preference(self):
+        self.assertIsNone(read_preference(None))
+        self.assertEqual(read_preference('primary'), ReadPreference.PRIMARY)
+        self.assertEqual(read_preference('nearest'), ReadPreference.NEAREST)
+        self.assertIs(read_preference(ReadPreference.SECONDARY), ReadPreference.SECONDARY)
+
+        mode = read_preference('secondaryPreferred', 90)
+        self.assertEqual(mode.document, {'mode': 'secondaryPreferred', 'maxStalenessSeconds': 90})
+
+        with self.assertRaises(ValueError):
+            read_preference('anywhere')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# -*- coding:utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+"""
+Tests for `schema` module.
+"""
+from datetime import datetime
+import time
+import unittest
+
+from turbo_motor.schema import Schema, get_schema
+
+NOW = datetime(2017, 1, 1)
+
+
+class Model(object):
+
+    field = {
+        '_id': (int, None),
+        'name': (str, None),
+        'value': (int, 0),
+        'atime': (datetime, None),
+        'ctime': (datetime, NOW),
+        'utime': (time, None),
+    }
+
+    @staticmethod
+    def datetime():
+        return NOW
+
+    @staticmethod
+    def timestamp():
+        return 1
+
+
+class SubModel(Model):
+    pass
+
+
+class SchemaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = Schema(Model.field)
+
+    def test_compile(self):
+        self.assertEqual(self.schema.keys, frozenset(['name', 'value', 'atime', 'ctime', 'utime']))
+        self.assertEqual(self.schema.factories, {'atime': 'datetime', 'utime': 'timestamp'})
+        self.assertEqual(self.schema.defaults, {'name': None, 'value': 0, 'ctime': NOW})
+
+    def test_validate(self):
+        record = self.schema.validate(Model, {'_id': 1, 'value': 2})
+        self.assertEqual(record, {
+            '_id': 1, 'name': None, 'value': 2, 'atime': NOW, 'ctime': NOW, 'utime': 1})
+
+        full = dict(record, value=3)
+        self.assertIs(self.schema.validate(Model, full), full)
+        self.assertEqual(full['value'], 3)
+
+        with self.assertRaises(Exception):
+            self.schema.validate(Model, {'nokey': 1})
+        with self.assertRaises(Exception):
+            self.schema.validate(Model, [('name', 1)])
+
+    def test_get_schema(self):
+        schema = get_schema(Model)
+        self.assertIs(get_schema(Model), schema)
+        self.assertIsNot(get_schema(SubModel), schema)
+
+
+if __name__ == '__main__':
+    unittest.main()
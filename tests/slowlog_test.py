@@ -0,0 +1,46 @@
+# -*- coding:utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+"""
+Tests for `slowlog` module.
+"""
+import unittest
+
+from turbo_motor.slowlog import describe, plan_summary, query_shape
+
+
+class SlowlogTest(unittest.TestCase):
+
+    def test_query_shape(self):
+        self.assertEqual(query_shape({'uid': 1, 'atime': {'$gt': 10}}), {'uid': '?', 'atime': {'$gt': '?'}})
+        self.assertEqual(query_shape({'_id': {'$in': [1, 2, 3]}}), {'_id': {'$in': ['?']}})
+        self.assertEqual(
+            query_shape({'$or': [{'a': 1}, {'b': 'x'}]}),
+            {'$or': [{'a': '?'}, {'b': '?'}]})
+        self.assertEqual(query_shape(None), '?')
+
+    def test_describe(self):
+        query = describe('find_many', ({'uid': 1}, {'name': 1}), {'sort': [('_id', -1)], 'limit': 10})
+        self.assertEqual(query['filter'], {'uid': 1})
+        self.assertEqual(query['projection'], {'name': 1})
+        self.assertEqual(query['sort'], [('_id', -1)])
+        self.assertEqual(query['limit'], 10)
+
+        query = describe('find_by_id', ([1, 2],), {})
+        self.assertEqual(query['filter'], {'_id': {'$in': [1, 2]}})
+
+        query = describe('update', ({'uid': 1}, {'$set': {'value': 1}}), {})
+        self.assertEqual(query['filter'], {'uid': 1})
+        self.assertIsNone(query['projection'])
+
+    def test_plan_summary(self):
+        plan = {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN', 'indexName': 'uid_1'}}
+        self.assertEqual(plan_summary(plan), 'FETCH > IXSCAN(uid_1)')
+        self.assertEqual(plan_summary({'stage': 'COLLSCAN'}), 'COLLSCAN')
+
+
+if __name__ == '__main__':
+    unittest.main()
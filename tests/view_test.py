@@ -0,0 +1,227 @@
+# -*- coding:utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+"""
+Tests for `view` module.
+
+following changes needs a replica set, start a single
+node one with
+
+    mongod --replSet rs0 && mongo --eval 'rs.initiate()'
+"""
+import unittest
+
+from bson.objectid import ObjectId
+from pymongo import MongoClient
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.ioloop import IOLoop
+from tornado.testing import gen_test, AsyncTestCase
+import motor
+
+from turbo_motor.model import BaseModel
+from turbo_motor.view import MaterializedView, projection_fields
+
+
+class Tag(BaseModel):
+
+    name = 'turbo_motor_view'
+    field = {
+        'name': (str, None),
+        'value': (int, 0),
+    }
+    cache_size = 10
+
+
+def replica_set():
+    try:
+        client = MongoClient(serverSelectionTimeoutMS=500)
+        return bool(client.admin.command('ismaster').get('setName'))
+    except Exception:
+        return False
+
+
+class ProjectionTest(unittest.TestCase):
+
+    def test_projection_fields(self):
+        self.assertIsNone(projection_fields(None))
+        self.assertEqual(projection_fields(['name']), frozenset(['_id', 'name']))
+        self.assertEqual(projection_fields({'name': 1, '_id': 0}), frozenset(['_id', 'name']))
+        with self.assertRaises(ValueError):
+            projection_fields({'name': 0})
+        with self.assertRaises(ValueError):
+            projection_fields(['up.name'])
+
+
+class ApplyTest(AsyncTestCase):
+
+    def setUp(self):
+        super(ApplyTest, self).setUp()
+        db = {
+            'db': {'test': motor.MotorClient()['test']},
+            'db_file': {'test': None}
+        }
+        self.tag = Tag('test', db)
+        self.changes = []
+        self.view = self.tag.materialized_view(
+            ['name'], on_change=lambda *args: self.changes.append(args))
+
+    def test_apply(self):
+        _id = ObjectId()
+        self.view._apply({
+            '_id': 1, 'operationType': 'insert', 'documentKey': {'_id': _id},
+            'fullDocument': {'_id': _id, 'name': 'a', 'value': 1}})
+        self.assertEqual(self.view.get(_id), {'_id': _id, 'name': 'a'})
+        self.assertEqual(self.view.resume_token, 1)
+        self.assertEqual(self.changes, [('insert', _id, {'_id': _id, 'name': 'a'})])
+
+        # update of a document deleted before lookup
+        self.view._apply({
+            '_id': 2, 'operationType': 'update', 'documentKey': {'_id': _id}, 'fullDocument': None})
+        self.assertNotIn(_id, self.view)
+
+        self.view._apply({
+            '_id': 3, 'operationType': 'replace', 'documentKey': {'_id': _id},
+            'fullDocument': {'_id': _id, 'name': 'b'}})
+        self.view._apply({'_id': 4, 'operationType': 'delete', 'documentKey': {'_id': _id}})
+        self.assertEqual(len(self.view), 0)
+
+        self.view._apply({'_id': 5, 'operationType': 'invalidate'})
+        self.assertIsNone(self.view.resume_token)
+
+    @gen_test
+    def test_reload(self):
+        events = []
+
+        class Stream(object):
+            # cursor opened by motor on an executor thread
+            delegate = None
+
+            def next(self):
+                IOLoop.current().call_later(0.05, self.open)
+                return Future()
+
+            def open(self):
+                events.append('stream')
+                self.delegate = object()
+
+            def close(self):
+                future = Future()
+                future.set_result(None)
+                return future
+
+        class Cursor(object):
+
+            def to_list(self, length):
+                events.append('find')
+                future = Future()
+                future.set_result([{'_id': 1, 'name': 'a'}])
+                return future
+
+        class Collection(object):
+
+            def watch(self, **kwargs):
+                return Stream()
+
+            def find(self, *args):
+                return Cursor()
+
+        view = MaterializedView(self.tag, Collection())
+        yield view._reload()
+        self.assertEqual(events, ['stream', 'find'])
+        self.assertEqual(view.get(1), {'_id': 1, 'name': 'a'})
+        yield view.stop()
+
+    @gen_test
+    def test_start_failed(self):
+        closed = []
+
+        class Stream(object):
+            delegate = None
+
+            def next(self):
+                future = Future()
+                future.set_exception(RuntimeError('stream failed'))
+                return future
+
+            def close(self):
+                closed.append(1)
+                future = Future()
+                future.set_result(None)
+                return future
+
+        class Collection(object):
+
+            def watch(self, **kwargs):
+                return Stream()
+
+        view = MaterializedView(self.tag, Collection())
+        with self.assertRaises(RuntimeError):
+            yield view.start()
+        self.assertEqual(len(closed), 1)
+        self.assertIsNone(view._stream)
+
+        # start is retried instead of returning as already running
+        with self.assertRaises(RuntimeError):
+            yield view.start()
+        self.assertEqual(len(closed), 2)
+
+
+@unittest.skipUnless(replica_set(), 'needs a replica set')
+class MaterializedViewTest(AsyncTestCase):
+
+    def setUp(self):
+        super(MaterializedViewTest, self).setUp()
+        db = {
+            'db': {'test': motor.MotorClient()['test']},
+            'db_file': {'test': None}
+        }
+        self.tag = Tag('test', db)
+        self.ids = [ObjectId() for i in range(3)]
+        MongoClient()['test'][Tag.name].insert_many(
+            [{'_id': i, 'name': 'a', 'value': 0} for i in self.ids])
+
+    def tearDown(self):
+        super(MaterializedViewTest, self).tearDown()
+        MongoClient()['test'][Tag.name].drop()
+
+    @gen.coroutine
+    def wait(self, check):
+        for i in range(100):
+            if check():
+                return
+            yield gen.sleep(0.05)
+        self.fail('view not updated')
+
+    @gen_test(timeout=10)
+    def test_view(self):
+        view = self.tag.materialized_view({'name': 1})
+        self.assertIsInstance(view, MaterializedView)
+        yield view.start()
+        self.assertTrue(view.ready)
+        self.assertEqual(len(view), 3)
+        self.assertEqual(view.get(self.ids[0]), {'_id': self.ids[0], 'name': 'a'})
+
+        yield self.tag.find_by_id(self.ids[1])
+        self.assertEqual(self.tag.cache_info()['size'], 1)
+
+        _id = yield self.tag.insert({'name': 'b'})
+        yield self.wait(lambda: _id in view)
+        yield self.tag.update_one({'_id': self.ids[0]}, {'$set': {'name': 'c'}})
+        yield self.wait(lambda: view.get(self.ids[0])['name'] == 'c')
+
+        # write bypassing the model still invalidate its cache
+        MongoClient()['test'][Tag.name].delete_one({'_id': self.ids[1]})
+        yield self.wait(lambda: self.ids[1] not in view)
+        self.assertEqual(self.tag.cache_info()['size'], 0)
+        self.assertIsNotNone(view.resume_token)
+
+        yield view.stop()
+        self.assertFalse(view.ready)
+
+
+if __name__ == '__main__':
+    unittest.main()
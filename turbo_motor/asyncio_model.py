@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""native coroutine model on motor asyncio, python 3.6+ only
+
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from turbo_motor.asyncio_model import AsyncBaseModel
+
+    class Tag(AsyncBaseModel):
+        name = 'tag'
+        field = {...}
+
+    tag = Tag('test', {'db': {'test': AsyncIOMotorClient()['test']}, 'db_file': {'test': None}})
+    doc = await tag.find_by_id(_id)
+"""
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import DESCENDING
+from turbo.mongo_model import _record
+from turbo.mongo_model import AbstractModel
+
+from turbo_motor.cursor import DEFAULT_BATCH_SIZE
+from turbo_motor.model import _as_dict_query
+from turbo_motor.model import _AsDict
+from turbo_motor.model import _init_collection
+from turbo_motor.schema import get_schema
+
+
+class AsyncBaseBaseModel(AbstractModel):
+    """same collection methods as BaseBaseModel written as async def,
+    no tornado.gen involved
+    """
+
+    # documents per server round-trip when draining cursors
+    batch_size = DEFAULT_BATCH_SIZE
+
+    # default projection of get_as_dict
+    column = None
+
+    def __init__(self, db_name='test', _MONGO_DB_MAPPING=None):
+        self.__collect, self.__gridfs = self._init(db_name, _MONGO_DB_MAPPING)
+
+    def _init(self, db_name, _mongo_db_mapping):
+        """collection and gridfs resolved once per model class and database
+        """
+        return _init_collection(self, db_name, _mongo_db_mapping)
+
+    def __getattr__(self, k):
+        """proxy collection attribute, resolved method is kept on the instance
+        so next access skip __getattr__, sub collection is refused
+        """
+        attr = getattr(self.__collect, k)
+        if isinstance(attr, AsyncIOMotorCollection):
+            raise AttributeError(
+                "model object '%s' has not attribute '%s'" % (self.name, k))
+        if callable(attr):
+            self.__dict__[k] = attr
+        return attr
+
+    def sub_collection(self, name):
+        return self.__collect[name]
+
+    def _valid_record(self, record):
+        return get_schema(self.__class__).validate(self, record)
+
+    async def insert(self, doc_or_docs, **kwargs):
+        """
+        return:
+            insert doc _id backwards compatibility
+        """
+        check = kwargs.pop('check', True)
+        if isinstance(doc_or_docs, dict):
+            if check is True:
+                doc_or_docs = self._valid_record(doc_or_docs)
+            result = await self.__collect.insert_one(doc_or_docs, **kwargs)
+            return self._to_primary_key(result.inserted_id)
+        else:
+            if check is True:
+                for d in doc_or_docs:
+                    d = self._valid_record(d)
+            result = await self.__collect.insert_many(doc_or_docs, **kwargs)
+            return result.inserted_ids
+
+    async def save(self, to_save, **kwargs):
+        """save method
+        """
+        self._valid_record(to_save)
+        if '_id' in to_save:
+            await self.__collect.replace_one(
+                {'_id': to_save['_id']}, to_save, **kwargs)
+            return to_save['_id']
+        else:
+            result = await self.__collect.insert_one(to_save, **kwargs)
+            return self._to_primary_key(result.inserted_id)
+
+    async def update(self, filter_, document, multi=False, **kwargs):
+        """update method
+        """
+        self._valide_update_document(document)
+        if multi:
+            return await self.__collect.update_many(filter_, document, **kwargs)
+        return await self.__collect.update_one(filter_, document, **kwargs)
+
+    async def remove(self, filter_=None, **kwargs):
+        """collection remove method
+        warning:
+            if you want to remove all documents,
+            you must override _remove_all method to make sure
+            you understand the result what you do
+        """
+        if isinstance(filter_, dict) and filter_ == {}:
+            raise ValueError("not allowed remove all documents")
+
+        if filter_ is None:
+            raise ValueError("not allowed remove all documents")
+
+        if kwargs.pop('multi', False) is True:
+            return await self.__collect.delete_many(filter_, **kwargs)
+        return await self.__collect.delete_one(filter_, **kwargs)
+
+    async def insert_one(self, doc_or_docs, **kwargs):
+        check = kwargs.pop('check', True)
+        if check is True:
+            self._valid_record(doc_or_docs)
+        return await self.__collect.insert_one(doc_or_docs, **kwargs)
+
+    async def insert_many(self, doc_or_docs, **kwargs):
+        check = kwargs.pop('check', True)
+        if check is True:
+            for i in doc_or_docs:
+                i = self._valid_record(i)
+        return await self.__collect.insert_many(doc_or_docs, **kwargs)
+
+    async def find_one(self, filter_=None, *args, **kwargs):
+        """
+        :args
+            wrapper wrap result to _record or not
+
+        """
+        wrapper = kwargs.pop('wrapper', False)
+        result = await self.__collect.find_one(filter_, *args, **kwargs)
+        if wrapper is True:
+            return _record(result)
+
+        return result
+
+    async def find_many(self, *args, **kwargs):
+        """find many return motor cursor result, limit is required
+        use iter_many to stream large result
+        :args
+            wrapper wrap result to _record or not
+            batch_size number of documents fetched per round-trip
+        """
+        wrapper = kwargs.pop('wrapper', False)
+        kwargs.setdefault('batch_size', self.batch_size)
+        limit = kwargs.get('limit')
+        if not limit:
+            kwargs['limit'] = 1
+        result = await self.__collect.find(*args, **kwargs).to_list(length=None)
+        if wrapper:
+            result = [_record(doc) for doc in result]
+
+        return result
+
+    async def iter_many(self, *args, **kwargs):
+        """async generator of find result, no limit is applied unless given,
+        stop early by closing the generator
+
+            async for doc in model.iter_many({'uid': uid}):
+                ...
+        """
+        wrapper = kwargs.pop('wrapper', False)
+        batch_size = kwargs.pop('batch_size', self.batch_size)
+        cursor = self.__collect.find(*args, batch_size=batch_size, **kwargs)
+        try:
+            while cursor.alive:
+                for doc in await cursor.to_list(length=batch_size):
+                    yield _record(doc) if wrapper else doc
+        finally:
+            await cursor.close()
+
+    async def update_one(self, filter_, document, **kwargs):
+        """update method
+        """
+        self._valide_update_document(document)
+        return await self.__collect.update_one(filter_, document, **kwargs)
+
+    async def update_many(self, filter_, document, **kwargs):
+        self._valide_update_document(document)
+        return await self.__collect.update_many(filter_, document, **kwargs)
+
+    async def delete_many(self, filter_):
+        if isinstance(filter_, dict) and filter_ == {}:
+            raise ValueError("not allowed remove all documents")
+
+        if filter_ is None:
+            raise ValueError("not allowed remove all documents")
+
+        return await self.__collect.delete_many(filter_)
+
+    async def find_by_id(self, _id, projection=None):
+        """find record by _id
+        """
+        if isinstance(_id, list) or isinstance(_id, tuple):
+            ids = [self._to_primary_key(i) for i in _id]
+            return await self.find_many({'_id': {'$in': ids}}, projection, limit=len(ids))
+
+        document_id = self._to_primary_key(_id)
+
+        if document_id is None:
+            return None
+
+        return await self.__collect.find_one({'_id': document_id}, projection)
+
+    async def remove_by_id(self, _id):
+        if isinstance(_id, list) or isinstance(_id, tuple):
+            return await self.__collect.delete_many(
+                {'_id': {'$in': [self._to_primary_key(i) for i in _id]}})
+
+        return await self.__collect.delete_one({'_id': self._to_primary_key(_id)})
+
+    async def find_new_one(self, *args, **kwargs):
+        cur = self.__collect.find(*args, **kwargs)
+        cur.limit(1).sort('_id', DESCENDING)
+        for document in await cur.to_list(length=1):
+            return document
+
+    async def get_as_dict(self, *args, **kwargs):
+        """no limit argument, result will be all record in collection
+        :args
+            key field used as dict key, default _id, dotted path allowed
+            result 'both' return [as_dict, as_list], 'dict' or 'list' only one
+            max_size raise ValueError if more documents matched
+            projection default model column, key field is always included
+        """
+        key = kwargs.pop('key', '_id')
+        max_size = kwargs.pop('max_size', None)
+        collector = _AsDict(key, kwargs.pop('result', 'both'), max_size)
+        args, kwargs = _as_dict_query(args, kwargs, key, self.column, self.batch_size, max_size)
+        cur = self.__collect.find(*args, **kwargs)
+        while True:
+            batch = await cur.to_list(length=kwargs['batch_size'])
+            if not batch:
+                break
+
+            if collector.add(batch):
+                await cur.close()
+                raise ValueError(
+                    "get_as_dict matched more than %s documents in %s" % (max_size, self.name))
+
+        return collector.result()
+
+    async def inc(self, filter_, key, num=1):
+        return await self.__collect.update_one(filter_, {'$inc': {key: num}})
+
+
+class AsyncBaseModel(AsyncBaseBaseModel):
+    pass
@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from timeit import default_timer
+
+from bson import BSON
+from bson.objectid import ObjectId
+from pymongo import DeleteMany
+from pymongo import DeleteOne
+from pymongo import InsertOne
+from pymongo import ReplaceOne
+from pymongo import UpdateMany
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from pymongo.errors import WriteConcernError
+from pymongo.errors import WriteError
+from tornado import gen
+from tornado import locks
+from tornado.concurrent import Future
+from tornado.ioloop import IOLoop
+from turbo.log import model_log
+
+from turbo_motor import metrics
+
+
+class BulkWriter(object):
+    """queue write operations of a model and send them as unordered
+    bulk_write batches once max_ops operations or max_bytes are queued,
+    or interval seconds after the first queued operation
+
+    every write method return a future resolve when its batch is written:
+        insert          document _id
+        update with upsert    upserted _id or None
+        others          None
+    a failed operation set its own future exception, other operations of
+    the batch are not affected, a write concern error is set on every
+    operation of the batch without its own error
+
+    usage:
+        writer = model.bulk_writer(max_ops=500, interval=0.5)
+        writer.insert({'uid': uid})
+        writer.inc({'_id': _id}, 'value')
+        # on shutdown
+        yield writer.close()
+    """
+
+    def __init__(self, model, max_ops=1000, max_bytes=8 * 1024 * 1024, interval=1.0):
+        self._model = model
+        self.max_ops = max_ops
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self._ops = []
+        self._futures = []
+        self._filters = []
+        self._bytes = 0
+        self._timeout = None
+        # futures of batches in flight, flush and close wait for them
+        self._flushing = set()
+        self.closed = False
+
+    def __len__(self):
+        return len(self._ops)
+
+    def insert(self, doc, check=True):
+        if check is True:
+            doc = self._model._valid_record(doc)
+        if '_id' not in doc:
+            doc['_id'] = ObjectId()
+        return self._add(InsertOne(doc), doc, None, doc['_id'])
+
+    def update_one(self, filter_, document, upsert=False):
+        self._model._valide_update_document(document)
+        return self._add(UpdateOne(filter_, document, upsert), (filter_, document), filter_)
+
+    def update_many(self, filter_, document, upsert=False):
+        self._model._valide_update_document(document)
+        return self._add(UpdateMany(filter_, document, upsert), (filter_, document), filter_)
+
+    def inc(self, filter_, key, num=1):
+        document = {'$inc': {key: num}}
+        return self._add(UpdateOne(filter_, document), (filter_, document), filter_)
+
+    def delete_one(self, filter_):
+        _check_remove_filter(filter_)
+        return self._add(DeleteOne(filter_), filter_, filter_)
+
+    def delete_many(self, filter_):
+        _check_remove_filter(filter_)
+        return self._add(DeleteMany(filter_), filter_, filter_)
+
+    def _add(self, op, payload, filter_, result=None):
+        if self.closed:
+            raise ValueError('bulk writer is closed')
+
+        future = Future()
+        self._ops.append(op)
+        self._futures.append((future, result))
+        self._filters.append(filter_)
+        self._bytes += _bson_size(payload)
+
+        if len(self._ops) >= self.max_ops or self._bytes >= self.max_bytes:
+            self._send()
+        elif self._timeout is None and self.interval:
+            self._timeout = IOLoop.current().call_later(self.interval, self._on_timeout)
+
+        return future
+
+    def _on_timeout(self):
+        self._timeout = None
+        self._send()
+
+    def _send(self):
+        """start writing queued operations as one batch in background
+        """
+        if self._timeout is not None:
+            IOLoop.current().remove_timeout(self._timeout)
+            self._timeout = None
+
+        if not self._ops:
+            return
+
+        future = self._write()
+        self._flushing.add(future)
+        future.add_done_callback(self._flushing.discard)
+
+    @gen.coroutine
+    def flush(self):
+        """send every queued operation, return when it and every batch
+        already in flight are written, failed or not, errors are only set
+        on operation futures
+        """
+        self._send()
+        while self._flushing:
+            for future in list(self._flushing):
+                try:
+                    yield future
+                except Exception:
+                    model_log.exception('bulk write of %s failed' % self._model.name)
+
+    @gen.coroutine
+    def _write(self):
+        ops, futures, filters, nbytes = self._ops, self._futures, self._filters, self._bytes
+        self._ops, self._futures, self._filters, self._bytes = [], [], [], 0
+
+        errors, concern_error, upserted, start = {}, None, {}, default_timer()
+        try:
+            result = yield self._model.bulk_write(ops, ordered=False)
+            upserted = result.upserted_ids or {}
+        except BulkWriteError as e:
+            errors, concern_error = _bulk_write_errors(e.details)
+            upserted = dict((u['index'], u['_id']) for u in e.details.get('upserted', []))
+        except Exception as e:
+            for future, _ in futures:
+                future.set_exception(e)
+            self._emit(start, 0, nbytes, e)
+            # the batch runs detached, its error belongs to operation futures
+            return
+        finally:
+            for filter_ in filters:
+                if filter_ is not None:
+                    self._model._invalidate(filter_)
+
+        self._emit(start, len(ops) - len(errors), nbytes, None)
+
+        for index, (future, value) in enumerate(futures):
+            if index in errors:
+                future.set_exception(errors[index])
+            elif concern_error is not None:
+                future.set_exception(concern_error)
+            else:
+                future.set_result(upserted.get(index, value))
+
+    def _emit(self, start, count, nbytes, error):
+        if metrics.enabled():
+            metrics.emit(metrics.OperationEvent(
+                self._model.name, 'bulk_writer', default_timer() - start, count, nbytes, error))
+
+    @gen.coroutine
+    def close(self):
+        """flush queued operations and refuse new ones
+        """
+        self.closed = True
+        yield self.flush()
+
+
+def _bulk_write_errors(details):
+    """return index -> WriteError of every failed operation and
+    WriteConcernError, or None, from BulkWriteError details
+    """
+    errors = {}
+    for error in details.get('writeErrors', []):
+        errors[error['index']] = WriteError(error.get('errmsg'), error.get('code'), error)
+
+    concern_error = None
+    concern_errors = details.get('writeConcernErrors')
+    if concern_errors:
+        error = concern_errors[-1]
+        concern_error = WriteConcernError(error.get('errmsg'), error.get('code'), error)
+    return errors, concern_error
+
+
+def _check_remove_filter(filter_):
+    if filter_ is None or (isinstance(filter_, dict) and filter_ == {}):
+        raise ValueError("not allowed remove all documents")
+
+
+def _bson_size(payload):
+    if isinstance(payload, tuple):
+        return sum(len(BSON.encode(i)) for i in payload)
+    return len(BSON.encode(payload))
+
+
+class ImportResult(object):
+    """result of import_many
+
+    inserted_ids  _id of inserted documents in input order
+    errors        list of (chunk index, exception)
+    """
+
+    def __init__(self):
+        self.inserted_ids = []
+        self.errors = []
+
+    def __repr__(self):
+        return '<ImportResult inserted=%d errors=%d>' % (len(self.inserted_ids), len(self.errors))
+
+
+_executor = None
+
+
+def _default_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(4)
+    return _executor
+
+
+def _prepare_chunk(model, docs, check, max_bytes):
+    """validate documents, assign _id and split by max_bytes,
+    run in executor
+    """
+    batches, batch, size = [], [], 0
+    for doc in docs:
+        if check is True:
+            doc = model._valid_record(doc)
+        if '_id' not in doc:
+            doc['_id'] = ObjectId()
+        doc_size = len(BSON.encode(doc))
+        if batch and size + doc_size > max_bytes:
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(doc)
+        size += doc_size
+
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+@gen.coroutine
+def import_many(model, docs, chunk_size=1000, max_bytes=8 * 1024 * 1024,
+                concurrency=4, executor=None, check=True):
+    """insert docs, list or any iterable, in chunks of at most chunk_size
+    documents and max_bytes of BSON, every chunk is validated in executor,
+    a shared pool of 4 threads by default, and at most concurrency chunks
+    are in flight
+
+    return ImportResult
+    """
+    executor = executor or _default_executor()
+    semaphore = locks.Semaphore(concurrency)
+    inserted, result = {}, ImportResult()
+
+    @gen.coroutine
+    def import_chunk(index, chunk):
+        try:
+            batches = yield executor.submit(_prepare_chunk, model, chunk, check, max_bytes)
+            # ids of batches inserted before a failing one are kept
+            ids = inserted[index] = []
+            for batch in batches:
+                try:
+                    yield model._insert_many(batch, ordered=False, check=False)
+                    ids.extend(doc['_id'] for doc in batch)
+                except BulkWriteError as e:
+                    failed = set(error['index'] for error in e.details.get('writeErrors', []))
+                    ids.extend(doc['_id'] for i, doc in enumerate(batch) if i not in failed)
+                    result.errors.append((index, e))
+        except Exception as e:
+            result.errors.append((index, e))
+        finally:
+            semaphore.release()
+
+    futures, docs, index = [], iter(docs), 0
+    while True:
+        chunk = list(islice(docs, chunk_size))
+        if not chunk:
+            break
+
+        yield semaphore.acquire()
+        futures.append(import_chunk(index, chunk))
+        index += 1
+
+    yield futures
+    for i in range(index):
+        result.inserted_ids.extend(inserted.get(i, []))
+    result.errors.sort(key=lambda e: e[0])
+    raise gen.Return(result)
+
+
+class SaveResult(object):
+    """result of save_many
+
+    ids     _id of every document in input order, None when it failed
+    errors  list of (input index, exception) sorted by index
+    """
+
+    def __init__(self, size):
+        self.ids = [None] * size
+        self.errors = []
+
+    def __repr__(self):
+        return '<SaveResult saved=%d errors=%d>' % (len(self.ids) - len(self.errors), len(self.errors))
+
+
+def _save_op(model, doc, check):
+    """validated document and its ReplaceOne upsert, InsertOne with a new
+    _id when it has none
+    """
+    if check is True:
+        doc = model._valid_record(doc)
+    if '_id' in doc:
+        return doc, ReplaceOne({'_id': doc['_id']}, doc, upsert=True)
+
+    doc['_id'] = ObjectId()
+    return doc, InsertOne(doc)
+
+
+def _batch_errors(error, size):
+    """index -> exception of every operation of a batch of size failed by
+    error of its bulk_write, a write concern error fail the ones without
+    their own error
+    """
+    if not isinstance(error, BulkWriteError):
+        return dict((i, error) for i in range(size))
+
+    errors, concern_error = _bulk_write_errors(error.details)
+    if concern_error is not None:
+        for i in range(size):
+            errors.setdefault(i, concern_error)
+    return errors
+
+
+@gen.coroutine
+def _save_batch(model, docs, indexes, ops, result):
+    """write ops of docs at indexes as one bulk_write, record their _id
+    or error in result
+    """
+    failed = {}
+    try:
+        yield model.bulk_write(ops, ordered=False)
+    except Exception as e:
+        failed = _batch_errors(e, len(ops))
+
+    ids = []
+    for i, index in enumerate(indexes):
+        if i in failed:
+            result.errors.append((index, failed[i]))
+        else:
+            result.ids[index] = docs[index]['_id']
+        ids.append(docs[index]['_id'])
+    model._invalidate({'_id': {'$in': ids}})
+
+
+@gen.coroutine
+def save_many(model, docs, batch_size=1000, concurrency=4, check=True):
+    """save docs like save, but in unordered bulk_write batches of at most
+    batch_size operations with at most concurrency batches in flight,
+    document with _id is replaced or inserted by ReplaceOne upsert,
+    document without _id get one assigned here and is inserted, a write
+    concern error fails every document of its batch without its own error
+
+    return SaveResult
+    """
+    docs = list(docs)
+    result = SaveResult(len(docs))
+    semaphore = locks.Semaphore(concurrency)
+
+    @gen.coroutine
+    def save_batch(indexes, ops):
+        try:
+            yield _save_batch(model, docs, indexes, ops, result)
+        finally:
+            semaphore.release()
+
+    futures, indexes, ops = [], [], []
+    for index, doc in enumerate(docs):
+        try:
+            docs[index], op = _save_op(model, doc, check)
+        except Exception as e:
+            result.errors.append((index, e))
+            continue
+
+        ops.append(op)
+        indexes.append(index)
+
+        if len(ops) >= batch_size:
+            yield semaphore.acquire()
+            futures.append(save_batch(indexes, ops))
+            indexes, ops = [], []
+
+    if ops:
+        yield semaphore.acquire()
+        futures.append(save_batch(indexes, ops))
+
+    yield futures
+    result.errors.sort(key=lambda e: e[0])
+    raise gen.Return(result)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+from collections import OrderedDict
+import time
+
+from bson import BSON
+
+
+def freeze(value):
+    """convert filter or projection to a hashable value usable as key
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+
+    return value
+
+
+def query_key(value):
+    """bson bytes of filter or projection usable as key, unlike freeze
+    it keeps value types and key order, True and 1 or {'a': 1, 'b': 1}
+    and {'b': 1, 'a': 1} sub documents are different keys
+    """
+    if value is None:
+        return None
+    return BSON.encode({'q': value})
+
+
+class LRUCache(object):
+    """least recently used cache with per entry ttl
+
+    every entry is tagged, usually with the document _id, so all the
+    entries of one document (different projection) can be invalidated
+    together
+
+    generation is bumped by every invalidate and clear, a reader takes it
+    before querying and pass it to set as since, so a document read before
+    an invalidation of its tag is not cached after it
+
+        since = cache.generation
+        doc = yield collection.find_one({'_id': _id})
+        cache.set(_id, doc, _id, since)
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, timer=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data = OrderedDict()
+        self._tags = {}
+        # tag -> generation of its latest invalidation, sets older than
+        # _floor are refused once it is trimmed or the cache cleared
+        self._invalidated = {}
+        self._floor = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        value, tag, expire = entry
+        if expire is not None and expire <= self._timer():
+            self._untag(key, tag)
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        # move to the most recently used end
+        self._data[key] = entry
+        self.hits += 1
+        return value
+
+    def set(self, key, value, tag=None, since=None):
+        """since generation value was read at, value is dropped if its tag
+        was invalidated after
+        """
+        if since is not None and (since < self._floor or self._invalidated.get(tag, -1) > since):
+            return
+
+        old = self._data.pop(key, None)
+        if old is not None:
+            self._untag(key, old[1])
+
+        expire = self._timer() + self.ttl if self.ttl else None
+        self._data[key] = (value, tag, expire)
+        self._tags.setdefault(tag, set()).add(key)
+
+        while len(self._data) > self.maxsize:
+            oldest, entry = self._data.popitem(last=False)
+            self._untag(oldest, entry[1])
+            self.evictions += 1
+
+    def invalidate(self, tag):
+        self.generation += 1
+        self._invalidated[tag] = self.generation
+        if len(self._invalidated) > self.maxsize:
+            self._invalidated.clear()
+            self._floor = self.generation
+
+        for key in self._tags.pop(tag, ()):
+            self._data.pop(key, None)
+
+    def clear(self):
+        self.generation += 1
+        self._floor = self.generation
+        self._invalidated.clear()
+        self._data.clear()
+        self._tags.clear()
+
+    def info(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
+
+    def _untag(self, key, tag):
+        keys = self._tags.get(tag)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+
+
+def get_cache(registry, key, maxsize, ttl=None):
+    """return the cache registered under key in registry, a dict living as
+    long as the cached collection, created on first use
+    """
+    cache = registry.get(key)
+    if cache is None:
+        cache = registry[key] = LRUCache(maxsize, ttl)
+    return cache
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+from collections import OrderedDict
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from tornado import gen
+from tornado.ioloop import IOLoop
+from turbo.log import model_log
+
+from turbo_motor.cache import query_key
+
+
+class CounterBuffer(object):
+    """sum $inc of the same filter in memory and write them at most
+    interval seconds later as one update per document, several keys of
+    one document are combined into one $inc
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        # query_key(filter) -> (model, filter, {key: num}), increments of a
+        # filter are written and invalidated by the model of its first caller
+        self._pending = OrderedDict()
+        self._timeout = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def inc(self, model, filter_, key, num=1):
+        fkey = query_key(filter_)
+        entry = self._pending.get(fkey)
+        if entry is None:
+            entry = self._pending[fkey] = (model, filter_, {})
+        entry[2][key] = entry[2].get(key, 0) + num
+
+        if self._timeout is None:
+            self._timeout = IOLoop.current().call_later(self.interval, self._on_timeout)
+
+    def pending(self, filter_, key):
+        """increment of key not written yet
+        """
+        entry = self._pending.get(query_key(filter_))
+        if entry is None:
+            return 0
+        return entry[2].get(key, 0)
+
+    def _on_timeout(self):
+        self._timeout = None
+        IOLoop.current().spawn_callback(self.flush)
+
+    @gen.coroutine
+    def flush(self):
+        """write every pending increment, when the write fails as a whole
+        (network error, no primary) increments are kept and retried by next
+        flush, increments rejected by the server are logged and dropped
+        """
+        if self._timeout is not None:
+            IOLoop.current().remove_timeout(self._timeout)
+            self._timeout = None
+
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, OrderedDict()
+        # one bulk_write per model
+        batches = OrderedDict()
+        for model, filter_, keys in pending.values():
+            batches.setdefault(id(model), (model, []))[1].append((filter_, keys))
+        yield [self._write(model, entries) for model, entries in batches.values()]
+
+    @gen.coroutine
+    def _write(self, model, entries):
+        ops = [UpdateOne(filter_, {'$inc': keys}) for filter_, keys in entries]
+        try:
+            yield model.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            model_log.error('flush counters of %s failed %s' % (
+                model.name, e.details.get('writeErrors')))
+        except Exception:
+            for filter_, keys in entries:
+                for key, num in keys.items():
+                    self.inc(model, filter_, key, num)
+            raise
+        finally:
+            for filter_, _ in entries:
+                model._invalidate(filter_)
+
+
+def get_counter(registry, key, interval=1.0):
+    """return the counter buffer registered under key in registry, a dict
+    living as long as the counted collection, created on first use
+    """
+    counter = registry.get(key)
+    if counter is None:
+        counter = registry[key] = CounterBuffer(interval)
+    return counter
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+from collections import deque
+
+from tornado import gen
+from tornado.concurrent import Future
+from turbo.mongo_model import _record
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class DocumentStream(object):
+    """stream documents of a motor cursor batch by batch
+
+    documents are only fetched from the server when the consumer asks for
+    them, so memory is bounded by batch_size and a slow consumer throttles
+    the producer
+
+    usage:
+        stream = model.iter_many({'uid': uid}, batch_size=500)
+        while (yield stream.fetch_next):
+            doc = stream.next_object()
+
+        # or a whole batch at a time
+        docs = yield stream.next_batch()
+        while docs:
+            docs = yield stream.next_batch()
+
+    stop early with `yield stream.close()`, which kills the server cursor
+    """
+
+    def __init__(self, cursor, batch_size=DEFAULT_BATCH_SIZE, wrapper=False):
+        self._cursor = cursor
+        self._batch_size = batch_size
+        self._wrapper = wrapper
+        self._buffer = deque()
+        self.closed = False
+
+    @property
+    def cursor(self):
+        return self._cursor
+
+    @property
+    def alive(self):
+        return bool(self._buffer) or (not self.closed and self._cursor.alive)
+
+    @gen.coroutine
+    def next_batch(self):
+        """return next batch of documents, empty list when exhausted
+        """
+        if self._buffer:
+            batch = list(self._buffer)
+            self._buffer.clear()
+            raise gen.Return(batch)
+
+        if self.closed or not self._cursor.alive:
+            raise gen.Return([])
+
+        batch = yield self._cursor.to_list(length=self._batch_size)
+        if self._wrapper:
+            wrap = _record if self._wrapper is True else self._wrapper
+            batch = [wrap(doc) for doc in batch]
+
+        raise gen.Return(batch)
+
+    @property
+    def fetch_next(self):
+        """future resolve to True if next_object will return a document
+        """
+        if self._buffer:
+            future = Future()
+            future.set_result(True)
+            return future
+
+        return self._fetch_next()
+
+    @gen.coroutine
+    def _fetch_next(self):
+        batch = yield self.next_batch()
+        self._buffer.extend(batch)
+        raise gen.Return(bool(self._buffer))
+
+    def next_object(self):
+        if not self._buffer:
+            return None
+
+        return self._buffer.popleft()
+
+    @gen.coroutine
+    def close(self):
+        """stop iteration and kill the cursor on the server
+        """
+        self._buffer.clear()
+        if not self.closed:
+            self.closed = True
+            yield self._cursor.close()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+from pymongo.errors import ExecutionTimeout
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.ioloop import IOLoop
+
+
+def max_time_ms(timeout):
+    return max(int(timeout * 1000), 1)
+
+
+def time_left(deadline):
+    """seconds left before deadline of ioloop time, None without deadline,
+    ExecutionTimeout once passed
+    """
+    if deadline is None:
+        return None
+    left = deadline - IOLoop.current().time()
+    if left <= 0:
+        raise ExecutionTimeout('read exceeded its deadline')
+    return left
+
+
+def _first(futures):
+    """future resolved to the first of futures succeeding, or failed with
+    the error of the last one when all of them fail
+    """
+    first = Future()
+    pending = [len(futures)]
+
+    def done(f):
+        pending[0] -= 1
+        if first.done():
+            return
+        if f.exception() is None:
+            first.set_result(f)
+        elif pending[0] == 0:
+            first.set_exception(f.exception())
+
+    for future in futures:
+        future.add_done_callback(done)
+    return first
+
+
+@gen.coroutine
+def bounded_read(read, timeout=None, hedge_delay=None):
+    """run read with a deadline and an optional hedged duplicate
+
+    read(hedge) start one read and return (future, close), close is None
+    or called to cancel the read client side, hedge is True for the
+    duplicate sent when nothing answered after hedge_delay seconds,
+    first answer wins, ExecutionTimeout after timeout seconds
+    """
+    io_loop = IOLoop.current()
+    start = io_loop.time()
+    deadline = start + timeout if timeout is not None else None
+    attempts = [read(False)]
+
+    if hedge_delay is not None and (deadline is None or hedge_delay < timeout):
+        try:
+            yield gen.with_timeout(start + hedge_delay, attempts[0][0], quiet_exceptions=(Exception,))
+        except gen.TimeoutError:
+            attempts.append(read(True))
+        except Exception:
+            pass
+
+    winner = _first([future for future, _ in attempts])
+    try:
+        if deadline is None:
+            winner = yield winner
+        else:
+            winner = yield gen.with_timeout(deadline, winner, quiet_exceptions=(Exception,))
+    except gen.TimeoutError:
+        raise ExecutionTimeout('read exceeded %ss deadline' % timeout)
+    finally:
+        # losers are cancelled and their late errors retrieved, not logged
+        for future, close in attempts:
+            if future is winner:
+                continue
+            future.add_done_callback(lambda f: f.exception())
+            if close is not None and not future.done():
+                close()
+
+    raise gen.Return(winner.result())
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+from pymongo import IndexModel
+
+# index options compared against index_information
+COMPARED_OPTIONS = ('unique', 'sparse', 'expireAfterSeconds', 'partialFilterExpression')
+
+
+def to_index_model(spec):
+    """convert one model index declaration to IndexModel
+
+        [('uid', 1)]                                    keys
+        {'keys': [('atime', 1)], 'expireAfterSeconds': 3600}  keys and options
+        IndexModel([('uid', 1), ('atime', -1)], unique=True)
+    """
+    if isinstance(spec, IndexModel):
+        return spec
+
+    if isinstance(spec, dict):
+        options = dict(spec)
+        keys = options.pop('keys')
+        return IndexModel(list(keys), **options)
+
+    return IndexModel(list(spec))
+
+
+def index_keys(keys):
+    return tuple((k, v) for k, v in keys.items()) if hasattr(keys, 'items') else tuple(tuple(i) for i in keys)
+
+
+def diff(declared, information):
+    """compare declared IndexModel list with collection index_information
+
+    return (missing, different, undeclared)
+        missing     declared IndexModel absent from the collection
+        different   (IndexModel, existing name) same keys, other options
+        undeclared  existing index names not declared, _id index excluded
+    """
+    existing = dict((index_keys(info['key']), (name, info)) for name, info in information.items())
+    missing, different, matched = [], [], set()
+    for model in declared:
+        document = model.document
+        found = existing.get(index_keys(document['key']))
+        if found is None:
+            missing.append(model)
+            continue
+
+        name, info = found
+        matched.add(name)
+        for option in COMPARED_OPTIONS:
+            if document.get(option) != info.get(option) and (document.get(option) or info.get(option)):
+                different.append((model, name))
+                break
+
+    undeclared = [name for name in information if name not in matched and name != '_id_']
+    return missing, different, sorted(undeclared)
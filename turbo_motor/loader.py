@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+from collections import OrderedDict
+
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.ioloop import IOLoop
+
+from turbo_motor.cache import query_key
+
+
+class _Batch(object):
+
+    def __init__(self, model, projection):
+        # batch query is issued by the model of the first caller
+        self.model = model
+        self.projection = projection
+        # _id -> futures waiting for the document
+        self.waiters = OrderedDict()
+
+
+class IdLoader(object):
+    """collect find_by_id calls issued within one ioloop tick, or within
+    window seconds, and resolve them with a single $in query
+
+    usage:
+        user, other = yield [model.load_by_id(uid), model.load_by_id(other_uid)]
+    """
+
+    def __init__(self, window=0, max_batch=1000):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = {}
+
+    def load(self, model, _id, projection=None):
+        """return future resolve to the document or None
+        """
+        future = Future()
+        document_id = model._to_primary_key(_id)
+        if document_id is None:
+            future.set_result(None)
+            return future
+
+        key = query_key(projection)
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _Batch(model, projection)
+            if self.window:
+                IOLoop.current().call_later(self.window, self._dispatch, key, batch)
+            else:
+                IOLoop.current().add_callback(self._dispatch, key, batch)
+
+        batch.waiters.setdefault(document_id, []).append(future)
+        if len(batch.waiters) >= self.max_batch:
+            self._dispatch(key, batch)
+
+        return future
+
+    def load_many(self, model, ids, projection=None):
+        """return future resolve to documents aligned with ids, None for missing
+        """
+        return gen.multi_future([self.load(model, i, projection) for i in ids])
+
+    def _dispatch(self, key, batch):
+        # already dispatched because max_batch was reached
+        if self._pending.get(key) is not batch:
+            return
+
+        del self._pending[key]
+        IOLoop.current().spawn_callback(self._resolve, batch)
+
+    @gen.coroutine
+    def _resolve(self, batch):
+        try:
+            docs = yield batch.model.find_by_id(list(batch.waiters.keys()), batch.projection)
+        except Exception as e:
+            for futures in batch.waiters.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+
+        docs = dict((doc['_id'], doc) for doc in docs)
+        for document_id, futures in batch.waiters.items():
+            doc = docs.get(document_id)
+            for index, future in enumerate(futures):
+                # waiters of the same _id must not share one document
+                future.set_result(dict(doc) if doc is not None and index else doc)
+
+
+def get_loader(registry, key, window=0, max_batch=1000):
+    """return the loader registered under key in registry, a dict living as
+    long as the loaded collection, created on first use
+    """
+    loader = registry.get(key)
+    if loader is None:
+        loader = registry[key] = IdLoader(window, max_batch)
+    return loader
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+from collections import deque
+from collections import namedtuple
+import functools
+from timeit import default_timer
+
+from pymongo.results import BulkWriteResult
+from pymongo.results import DeleteResult
+from pymongo.results import InsertManyResult
+from pymongo.results import InsertOneResult
+from pymongo.results import UpdateResult
+
+from turbo_motor import slowlog
+
+
+# duration in seconds, count documents returned or affected,
+# nbytes None when unknown, error exception or None
+OperationEvent = namedtuple(
+    'OperationEvent', ['collection', 'operation', 'duration', 'count', 'nbytes', 'error'])
+
+_sinks = []
+
+
+def add_sink(sink):
+    """register callable receiving one OperationEvent per model operation
+    """
+    if sink not in _sinks:
+        _sinks.append(sink)
+
+
+def remove_sink(sink):
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+def enabled():
+    return bool(_sinks)
+
+
+def emit(event):
+    for sink in _sinks:
+        sink(event)
+
+
+def count_result(result):
+    """number of documents returned or affected by an operation result
+    """
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    if isinstance(result, UpdateResult):
+        return result.matched_count
+    if isinstance(result, DeleteResult):
+        return result.deleted_count
+    if isinstance(result, InsertManyResult):
+        return len(result.inserted_ids)
+    if isinstance(result, BulkWriteResult):
+        return result.inserted_count + result.matched_count + result.deleted_count + result.upserted_count
+    if isinstance(result, InsertOneResult):
+        return 1
+    inserted_ids = getattr(result, 'inserted_ids', None)
+    if inserted_ids is not None:
+        return len(inserted_ids)
+    return 1
+
+
+def instrument(count=count_result):
+    """decorate model method returning future, report OperationEvent to
+    sinks when it is done and slow reads or updates to slowlog, only a
+    list and an attribute check when no sink registered and no threshold
+    """
+    def decorator(func):
+        operation = func.__name__
+        slow = operation in slowlog.SLOW_OPERATIONS
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            threshold = self.slow_query_threshold if slow else None
+            if not _sinks and threshold is None:
+                return func(self, *args, **kwargs)
+
+            start = default_timer()
+            future = func(self, *args, **kwargs)
+
+            def done(f):
+                duration = default_timer() - start
+                error = f.exception()
+                if threshold is not None and duration >= threshold and error is None:
+                    slowlog.report(self, operation, duration, args, kwargs)
+                if _sinks:
+                    emit(OperationEvent(
+                        self.name, operation, duration,
+                        0 if error else count(f.result()), None, error))
+
+            future.add_done_callback(done)
+            return future
+
+        return wrapper
+
+    return decorator
+
+
+class HistogramSink(object):
+    """keep latest reservoir durations of every (collection, operation)
+    and report percentiles
+
+        sink = HistogramSink()
+        add_sink(sink)
+        sink.percentiles('tag', 'find_by_id')
+        {'count': 120, 'errors': 0, 'p50': 0.0012, 'p95': 0.003, 'p99': 0.011}
+    """
+
+    def __init__(self, reservoir=1024):
+        self.reservoir = reservoir
+        self._durations = {}
+        self._counts = {}
+
+    def __call__(self, event):
+        key = (event.collection, event.operation)
+        durations = self._durations.get(key)
+        if durations is None:
+            durations = self._durations[key] = deque(maxlen=self.reservoir)
+            self._counts[key] = [0, 0, 0]
+        durations.append(event.duration)
+        counts = self._counts[key]
+        counts[0] += 1
+        counts[1] += 1 if event.error else 0
+        counts[2] += event.count
+
+    def percentiles(self, collection, operation):
+        key = (collection, operation)
+        durations = self._durations.get(key)
+        if not durations:
+            return None
+
+        ordered = sorted(durations)
+        calls, errors, documents = self._counts[key]
+        return {
+            'count': calls,
+            'errors': errors,
+            'documents': documents,
+            'p50': _percentile(ordered, 50),
+            'p95': _percentile(ordered, 95),
+            'p99': _percentile(ordered, 99),
+        }
+
+    def summary(self):
+        return dict((key, self.percentiles(*key)) for key in self._durations)
+
+    def reset(self):
+        self._durations.clear()
+        self._counts.clear()
+
+
+def _percentile(ordered, percent):
+    index = int(round(percent / 100.0 * (len(ordered) - 1)))
+    return ordered[index]
@@ -4,31 +4,531 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import with_statement
 
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+from timeit import default_timer
+
+from bson.son import SON
 from motor.motor_tornado import MotorCollection
 from pymongo import DESCENDING
 from tornado import gen
+from tornado import locks
+from tornado.ioloop import IOLoop
 from turbo.mongo_model import _record
+from turbo.log import model_log
 from turbo.mongo_model import AbstractModel
+from turbo.mongo_model import MongoTurboConnect
+
+from turbo_motor.bulk import BulkWriter
+from turbo_motor.bulk import import_many
+from turbo_motor.bulk import save_many
+from turbo_motor.cache import freeze
+from turbo_motor.cache import get_cache
+from turbo_motor.cache import query_key
+from turbo_motor.counter import get_counter
+from turbo_motor.cursor import DEFAULT_BATCH_SIZE
+from turbo_motor.cursor import DocumentStream
+from turbo_motor.deadline import bounded_read
+from turbo_motor.deadline import max_time_ms
+from turbo_motor.deadline import time_left
+from turbo_motor import index as index_util
+from turbo_motor import page as page_util
+from turbo_motor.loader import get_loader
+from turbo_motor.metrics import instrument
+from turbo_motor.raw import RAW_CODEC_OPTIONS
+from turbo_motor.routing import read_preference as make_read_preference
+from turbo_motor.schema import get_schema
+from turbo_motor.record import kept_fields, make_record_class
+from turbo_motor.view import MaterializedView
+
+
+def _get_field(doc, key):
+    """get field value from document, dotted key walk into sub document
+    """
+    if '.' not in key:
+        return doc.get(key)
+
+    for k in key.split('.'):
+        if not isinstance(doc, Mapping):
+            return None
+        doc = doc.get(k)
+    return doc
+
+
+def _projection_with(projection, key):
+    """make sure key field is returned by an inclusion projection
+    """
+    if not projection:
+        return projection
+
+    if isinstance(projection, dict):
+        if key == '_id' or any(v for k, v in projection.items() if k != '_id'):
+            projection = dict(projection)
+            projection[key] = True
+        return projection
+
+    fields = list(projection)
+    if key not in fields:
+        fields.append(key)
+    return fields
+
+
+def _projection_of(args, kwargs):
+    """projection of find arguments, filter then projection
+    """
+    return args[1] if len(args) > 1 else kwargs.get('projection')
+
+
+def _as_dict_query(args, kwargs, key, column, batch_size, max_size):
+    """find arguments of get_as_dict, key field always projected, one more
+    document than max_size fetched to detect overflow
+    """
+    args = list(args)
+    if len(args) > 1:
+        args[1] = _projection_with(args[1], key)
+    else:
+        kwargs['projection'] = _projection_with(kwargs.get('projection', column), key)
+
+    kwargs.setdefault('batch_size', batch_size)
+    if max_size is not None:
+        limit = kwargs.get('limit')
+        if not limit or limit > max_size:
+            kwargs['limit'] = max_size + 1
+    return args, kwargs
+
+
+class _AsDict(object):
+    """accumulate get_as_dict batches into dict and or list
+    """
+
+    def __init__(self, key, result_type, max_size):
+        if result_type not in ('both', 'dict', 'list'):
+            raise ValueError("result must be one of 'both', 'dict', 'list'")
+        self.key = key
+        self.result_type = result_type
+        self.max_size = max_size
+        self.as_dict, self.as_list, self.count = {}, [], 0
+
+    def add(self, batch):
+        """return True once more than max_size documents are added
+        """
+        self.count += len(batch)
+        if self.result_type != 'dict':
+            self.as_list.extend(batch)
+        if self.result_type != 'list':
+            for doc in batch:
+                self.as_dict[_get_field(doc, self.key)] = doc
+        return self.max_size is not None and self.count > self.max_size
+
+    def result(self):
+        if self.result_type == 'dict':
+            return self.as_dict
+        if self.result_type == 'list':
+            return self.as_list
+        return [self.as_dict, self.as_list]
+
+
+def _filter_ids(filter_):
+    """return _id list a filter is restricted to, None if unknown
+    """
+    if not isinstance(filter_, dict) or '_id' not in filter_:
+        return None
+
+    value = filter_['_id']
+    if isinstance(value, list):
+        return None
+
+    if not isinstance(value, dict):
+        return [value]
+
+    if list(value.keys()) == ['$in']:
+        return list(value['$in'])
+
+    return None
+
+
+def _shape_by_id(docs, ids, ordered=False, as_dict=False):
+    """documents of find_by_id as _id -> document mapping, aligned with
+    ids, None for missing, or as they are
+    """
+    if as_dict:
+        return dict((doc['_id'], doc) for doc in docs)
+
+    if ordered:
+        mapping = dict((doc['_id'], doc) for doc in docs)
+        return [mapping.get(i) for i in ids]
+
+    return docs
+
+
+# in flight find_one futures keyed by collection, filter and projection
+_inflight = {}
+
+# cache misses are read from primary, a lagging secondary could fill the
+# cache with a document older than the last invalidation
+_FILL_READ_PREFERENCE = 'primary'
+
+
+class _Handles(object):
+    """collections resolved from one database and state shared by the
+    models of its collections, kept on the database itself so they are freed
+    with it, a process wide dict would keep every database ever mapped alive
+    through its collections
+    """
+
+    __slots__ = ('collections', 'derived', 'caches', 'loaders', 'counters')
+
+    def __init__(self):
+        # (model class, db_name, id of gridfs) -> (gridfs, motor collection),
+        # gridfs is kept so its id can not be reused while the entry lives
+        self.collections = {}
+        # (collection name, raw, read preference document) -> collection
+        # with those options
+        self.derived = {}
+        # (model class, collection name) -> LRUCache, IdLoader and
+        # CounterBuffer of the model
+        self.caches = {}
+        self.loaders = {}
+        self.counters = {}
+
+
+def _handles(database):
+    """_Handles of database, None when it can not carry one
+    """
+    attrs = getattr(database, '__dict__', None)
+    if attrs is None:
+        return None
+
+    handles = attrs.get('_turbo_motor_handles')
+    if handles is None:
+        handles = attrs['_turbo_motor_handles'] = _Handles()
+    return handles
+
+
+def _init_collection(model, db_name, _mongo_db_mapping):
+    """resolve collection and gridfs of the mapping once per database for
+    every model class, later instances only wrap the cached collection in
+    their own MongoTurboConnect
+    """
+    try:
+        database = _mongo_db_mapping['db'][db_name]
+        gridfs = _mongo_db_mapping['db_file'].get(db_name)
+    except (KeyError, TypeError, AttributeError):
+        return AbstractModel._init(model, db_name, _mongo_db_mapping)
+
+    handles = _handles(database)
+    if handles is None:
+        return AbstractModel._init(model, db_name, _mongo_db_mapping)
+
+    key = (model.__class__, db_name, id(gridfs))
+    handle = handles.collections.get(key)
+    if handle is None:
+        collect, gridfs = AbstractModel._init(model, db_name, _mongo_db_mapping)
+        handles.collections[key] = (gridfs, collect._collect)
+        return collect, gridfs
+
+    return MongoTurboConnect(model, handle[1]), handle[0]
+
+
+def _derive(collect, raw, read_preference, key):
+    """collection decoding to RawBSONDocument when raw and routed by
+    read_preference, shared by the models of its database
+    """
+    handles = _handles(collect.database)
+    derived = handles.derived.get((collect.name,) + key) if handles is not None else None
+    if derived is None:
+        options = {}
+        if raw:
+            options['codec_options'] = RAW_CODEC_OPTIONS
+        if read_preference is not None:
+            options['read_preference'] = read_preference
+        derived = collect.with_options(**options)
+        if handles is not None:
+            handles.derived[(collect.name,) + key] = derived
+    return derived
+
+
+class _WriteTrackingConnect(MongoTurboConnect):
+    """MongoTurboConnect recording when its model last issued a write,
+    used by models with read_your_writes
+    """
+
+    def __getattr__(self, name):
+        if name in self._write_operators:
+            self._model_ins._last_write = default_timer()
+        return MongoTurboConnect.__getattr__(self, name)
+
+
+def _count_as_dict(result):
+    if isinstance(result, dict):
+        return len(result)
+    if len(result) == 2 and isinstance(result[0], dict) and isinstance(result[1], list):
+        return len(result[1])
+    return len(result)
+
+
+def _is_id_filter(filter_):
+    """filter like {'_id': value}
+    """
+    return isinstance(filter_, dict) and len(filter_) == 1 and '_id' in filter_ \
+        and not isinstance(filter_['_id'], (dict, list))
 
 
 class BaseBaseModel(AbstractModel):
     """class implement almost all mongodb collection method
     """
 
+    # documents per server round-trip when draining cursors
+    batch_size = DEFAULT_BATCH_SIZE
+
+    # default projection of get_as_dict
+    column = None
+
+    # declared indexes created by sync_indexes, every item is a key list
+    # [('uid', 1), ('atime', -1)], a dict of keys and index options
+    # {'keys': [('atime', 1)], 'expireAfterSeconds': 3600, 'partialFilterExpression': {...}}
+    # or a pymongo IndexModel
+    index = ()
+
+    # find_by_id and find_one by _id read through a lru cache shared by all
+    # instances of the model on the same database when cache_size > 0, cache
+    # misses are read from primary and never hedged, cache_ttl is seconds
+    # one document stay in cache, None forever
+    cache_size = 0
+    cache_ttl = None
+
+    # concurrent find_by_id and find_one with same filter and projection
+    # share one query
+    coalesce_reads = False
+
+    # load_by_id batch window in seconds, 0 means one ioloop tick,
+    # and max ids of one batch query
+    loader_window = 0
+    loader_max_batch = 1000
+
+    # find_by_id split list of _id into $in queries of id_chunk_size
+    # with at most id_concurrency queries in flight
+    id_chunk_size = 1000
+    id_concurrency = 4
+
+    # inc sum increments in memory and write them at most inc_interval
+    # seconds later when inc_interval > 0
+    inc_interval = 0
+
+    # find_*, get_as_dict and update* slower than slow_query_threshold
+    # seconds are logged with redacted filter, once per filter shape every
+    # slow_query_interval seconds, and explained when slow_query_explain
+    slow_query_threshold = None
+    slow_query_explain = False
+    slow_query_interval = 60
+
+    # read preference of find_one, find_many, iter_many, find_by_id and
+    # get_as_dict, mode name 'primary', 'primaryPreferred', 'secondary',
+    # 'secondaryPreferred', 'nearest' or a pymongo read preference, None
+    # keeps the one of the mapping client, max_staleness seconds bound how
+    # far behind a secondary may be, -1 no bound, writes always go to primary
+    read_preference = None
+    max_staleness = -1
+
+    # reads of an instance go to primary for read_your_writes seconds after
+    # it issued a write when > 0
+    read_your_writes = 0
+    _last_write = None
+
+    # find_one, find_many and find_by_id fail with ExecutionTimeout after
+    # read_timeout seconds, sent to the server as maxTimeMS and enforced
+    # client side by closing the cursor, None no deadline
+    read_timeout = None
+
+    # a read not answered after hedge_delay seconds is duplicated with
+    # hedge_read_preference and the first answer wins, None never hedge
+    hedge_delay = None
+    hedge_read_preference = 'nearest'
+
     def __init__(self, db_name='test', _MONGO_DB_MAPPING=None):
-        self.__collect, self.__gridfs = super(
-            BaseBaseModel, self)._init(db_name, _MONGO_DB_MAPPING)
+        self.__collect, self.__gridfs = self._init(db_name, _MONGO_DB_MAPPING)
+        if self.read_your_writes > 0:
+            self.__collect = _WriteTrackingConnect(self, self.__collect._collect)
+        self.__readers = {}
+        # a database that can not carry _Handles share nothing between instances
+        self.__handles = _handles(self.__collect._collect.database) or _Handles()
+        self.__cache = None
+        if self.cache_size > 0:
+            self.__cache = get_cache(
+                self.__handles.caches, self._shared_key(), self.cache_size, self.cache_ttl)
+
+    def _init(self, db_name, _mongo_db_mapping):
+        """collection and gridfs resolved once per model class and database
+        """
+        return _init_collection(self, db_name, _mongo_db_mapping)
+
+    def _shared_key(self):
+        """key of the cache, loader and counter shared by the instances of
+        the model on the same database
+        """
+        return (self.__class__, self.__collect._collect.name)
 
     def __getattr__(self, k):
+        """proxy collection attribute, resolved method is kept on the instance
+        so next access skip __getattr__, sub collection is refused
+        """
         attr = getattr(self.__collect, k)
         if isinstance(attr, MotorCollection):
             raise AttributeError(
                 "model object '%s' has not attribute '%s'" % (self.name, k))
+        # write methods stay uncached so read_your_writes sees every write
+        if callable(attr) and not (self.read_your_writes > 0 and k in self.__collect._write_operators):
+            self.__dict__[k] = attr
         return attr
 
     def sub_collection(self, name):
         return self.__collect[name]
 
+    def _reader(self, raw=False, read_preference=None):
+        """collection reads go through, documents decoded to
+        RawBSONDocument when raw, routed by read_preference of the call, of
+        the model, or to primary within read_your_writes window
+        """
+        if self._last_write is not None and \
+                default_timer() - self._last_write < self.read_your_writes:
+            read_preference = 'primary'
+
+        # None, the model read preference, and mode names are resolved once
+        # per instance, pymongo read preferences by their document
+        key = (raw, freeze(read_preference.document) if hasattr(read_preference, 'document') else read_preference)
+        reader = self.__readers.get(key)
+        if reader is None:
+            reader = self.__readers[key] = self._make_reader(raw, read_preference)
+        return reader
+
+    def _make_reader(self, raw, read_preference):
+        read_preference = make_read_preference(read_preference or self.read_preference, self.max_staleness)
+        if not raw and read_preference is None:
+            return self.__collect
+
+        key = (raw, freeze(read_preference.document) if read_preference else None)
+        return MongoTurboConnect(self, _derive(self.__collect._collect, raw, read_preference, key))
+
+    @classmethod
+    def record_class(cls, projection=None):
+        """__slots__ record class generated once per model and projection
+        from field, wrap document without copy, missing field return its
+        default, field left out by the projection return None
+
+            Tag.record_class()(doc).name
+            Tag.record_class({'name': 1})(doc).value is None
+        """
+        field = cls.field or {}
+        fields = kept_fields(field, projection)
+        records = cls.__dict__.get('_record_classes')
+        if records is None:
+            records = cls._record_classes = {}
+        record = records.get(fields)
+        if record is None:
+            record = records[fields] = make_record_class(cls.__name__, field, fields)
+        return record
+
+    def _valid_record(self, record):
+        """validate and fill record with field schema compiled once per model
+        """
+        return get_schema(self.__class__).validate(self, record)
+
+    def _wrapper(self, wrapper, projection=None):
+        """function wrapping one document, None when not wrapped
+
+            True        _record defaultdict copy
+            'record'    model record_class of projection
+            callable    called with document
+        """
+        if wrapper is True:
+            return _record
+        if wrapper == 'record':
+            return self.record_class(projection)
+        if callable(wrapper):
+            return wrapper
+        return None
+
+    @gen.coroutine
+    def sync_indexes(self, create=True, background=True):
+        """compare declared index with collection index_information and
+        create missing ones concurrently, run it at startup without waiting:
+
+            IOLoop.current().spawn_callback(model.sync_indexes)
+
+        return dict of index names
+            created     created by this call
+            missing     declared but absent, create=False
+            different   declared with other options than existing index
+            undeclared  existing but not declared
+        """
+        declared = [index_util.to_index_model(i) for i in self.index or ()]
+        information = yield self.__collect.index_information()
+        missing, different, undeclared = index_util.diff(declared, information)
+
+        created = []
+        if create and missing:
+            for model in missing:
+                model.document.setdefault('background', background)
+            names = yield [self.__collect.create_indexes([model]) for model in missing]
+            created = [name for result in names for name in result]
+            missing = []
+
+        report = {
+            'created': created,
+            'missing': [model.document['name'] for model in missing],
+            'different': [name for model, name in different],
+            'undeclared': undeclared,
+        }
+        if created:
+            model_log.info('%s created index %s' % (self.name, created))
+        if missing or different or undeclared:
+            model_log.warning('%s index out of sync %s' % (self.name, report))
+        raise gen.Return(report)
+
+    def bulk_writer(self, **kwargs):
+        """return BulkWriter queue write operations into bulk_write batches
+        :args
+            max_ops, max_bytes, interval flush thresholds
+        """
+        return BulkWriter(self, **kwargs)
+
+    def materialized_view(self, projection=None, **kwargs):
+        """return MaterializedView, in memory _id -> document copy of the
+        collection kept current by a change stream once started
+        :args
+            projection top level fields kept, default whole document
+            on_change, retry_interval see MaterializedView
+        """
+        return MaterializedView(self, self.__collect._collect, projection, **kwargs)
+
+    def cache_info(self):
+        """hits, misses, evictions, expirations and size of document cache
+        """
+        if self.__cache is None:
+            return None
+        return self.__cache.info()
+
+    def cache_clear(self):
+        if self.__cache is not None:
+            self.__cache.clear()
+
+    def _invalidate(self, filter_):
+        """drop cached documents a write with filter_ may change
+        """
+        if self.__cache is None:
+            return
+
+        ids = _filter_ids(filter_)
+        if ids is None:
+            self.__cache.clear()
+            return
+
+        for i in ids:
+            self.__cache.invalidate(i)
+
+    @instrument()
     @gen.coroutine
     def insert(self, doc_or_docs, **kwargs):
         """
@@ -48,6 +548,7 @@ class BaseBaseModel(AbstractModel):
             result = yield self.__collect.insert_many(doc_or_docs, **kwargs)
             raise gen.Return(result.inserted_ids)
 
+    @instrument()
     @gen.coroutine
     def save(self, to_save, **kwargs):
         """save method
@@ -56,11 +557,13 @@ class BaseBaseModel(AbstractModel):
         if '_id' in to_save:
             yield self.__collect.replace_one(
                 {'_id': to_save['_id']}, to_save, **kwargs)
+            self._invalidate({'_id': to_save['_id']})
             raise gen.Return(to_save['_id'])
         else:
             result = yield self.__collect.insert_one(to_save, **kwargs)
             raise gen.Return(self._to_primary_key(result.inserted_id))
 
+    @instrument()
     @gen.coroutine
     def update(self, filter_, document, multi=False, **kwargs):
         """update method
@@ -73,8 +576,10 @@ class BaseBaseModel(AbstractModel):
             result = yield self.__collect.update_one(
                 filter_, document, **kwargs
             )
+        self._invalidate(filter_)
         raise gen.Return(result)
 
+    @instrument()
     @gen.coroutine
     def remove(self, filter_=None, **kwargs):
         """collection remove method
@@ -94,8 +599,10 @@ class BaseBaseModel(AbstractModel):
         else:
             result = yield self.__collect.delete_one(filter_, **kwargs)
 
+        self._invalidate(filter_)
         raise gen.Return(result)
 
+    @instrument()
     @gen.coroutine
     def insert_one(self, doc_or_docs, **kwargs):
         check = kwargs.pop('check', True)
@@ -104,8 +611,15 @@ class BaseBaseModel(AbstractModel):
         result = yield self.__collect.insert_one(doc_or_docs, **kwargs)
         raise gen.Return(result)
 
-    @gen.coroutine
+    @instrument()
     def insert_many(self, doc_or_docs, **kwargs):
+        return self._insert_many(doc_or_docs, **kwargs)
+
+    @gen.coroutine
+    def _insert_many(self, doc_or_docs, **kwargs):
+        """insert_many not reported to metrics and slowlog, for
+        instrumented methods built on it
+        """
         check = kwargs.pop('check', True)
         if check is True:
             for i in doc_or_docs:
@@ -113,53 +627,209 @@ class BaseBaseModel(AbstractModel):
         result = yield self.__collect.insert_many(doc_or_docs, **kwargs)
         raise gen.Return(result)
 
+    @instrument(count=lambda result: len(result.inserted_ids))
+    def import_many(self, docs, **kwargs):
+        """bulk import docs, list or generator, validated off the ioloop
+        and inserted by concurrent unordered insert_many of bounded size
+        :args
+            chunk_size, max_bytes, concurrency, executor, check
+
+        return future resolve to ImportResult
+        """
+        return import_many(self, docs, **kwargs)
+
+    @instrument(count=lambda result: len(result.ids) - len(result.errors))
+    def save_many(self, docs, **kwargs):
+        """save many documents in unordered bulk_write batches, with _id
+        replaced or upserted, without _id inserted with an _id assigned
+        :args
+            batch_size, concurrency, check
+
+        return future resolve to SaveResult
+        """
+        return save_many(self, docs, **kwargs)
+
+    @instrument()
     @gen.coroutine
     def find_one(self, filter_=None, *args, **kwargs):
         """
         :args
-            wrapper wrap result to _record or not
+            wrapper True wrap result to _record, 'record' to model
+                record_class, or callable called with result
+            raw return RawBSONDocument, bypass cache and coalesce_reads
+            read_preference of this call, bypass cache and coalesce_reads
+            timeout seconds, default model read_timeout
 
         """
-        wrapper = kwargs.pop('wrapper', False)
-        result = yield self.__collect.find_one(filter_, *args, **kwargs)
-        if wrapper is True:
+        wrap = self._wrapper(kwargs.pop('wrapper', False), args[0] if args else kwargs.get('projection'))
+        raw = kwargs.pop('raw', False)
+        read_preference = kwargs.pop('read_preference', None)
+        timeout = kwargs.pop('timeout', None)
+        if raw or read_preference is not None:
+            result = yield self._bounded_find_one(
+                raw, read_preference, timeout, filter_, *args, **kwargs)
+        elif len(args) + len(kwargs) <= 1 and set(kwargs) <= set(['projection']):
+            projection = args[0] if args else kwargs.get('projection')
+            if self.__cache is not None and _is_id_filter(filter_):
+                result = yield self._find_by_id_cached(filter_['_id'], projection, timeout)
+            else:
+                result = yield self._find_one(filter_, projection, timeout)
+        else:
+            result = yield self._bounded_find_one(False, None, timeout, filter_, *args, **kwargs)
+        if wrap is _record:
             raise gen.Return(_record(result))
+        if wrap is not None and result is not None:
+            raise gen.Return(wrap(result))
 
         raise gen.Return(result)
 
-    @gen.coroutine
+    @instrument()
     def find_many(self, *args, **kwargs):
         """find many return motor cursor result, limit is required
         coroutine can't return yield genearotr as result,
-        instead use a queue do infinite loop
+        use iter_many to stream large result
         http://stackoverflow.com/questions/33482066/using-regular-python-generator-in-tornado-coroutine
+        :args
+            wrapper True wrap result to _record, 'record' to model
+                record_class, or callable called with every document
+            batch_size number of documents fetched per round-trip
+            raw return RawBSONDocument decoded on field access
+            read_preference of this call, default model read_preference
+            timeout seconds, default model read_timeout
         """
-        wrapper = kwargs.pop('wrapper', False)
+        return self._find_many(*args, **kwargs)
+
+    @gen.coroutine
+    def _find_many(self, *args, **kwargs):
+        """find_many not reported to metrics and slowlog, for instrumented
+        methods built on it
+        """
+        wrap = self._wrapper(kwargs.pop('wrapper', False), _projection_of(args, kwargs))
+        raw = kwargs.pop('raw', False)
+        read_preference = kwargs.pop('read_preference', None)
+        reader = self._reader(raw, read_preference)
+        timeout = kwargs.pop('timeout', None) or self.read_timeout
+        hedge_delay = self._hedge_delay(read_preference)
+        kwargs.setdefault('batch_size', self.batch_size)
         limit = kwargs.get('limit')
         if not limit:
             kwargs['limit'] = 1
-        cursor = self.__collect.find(*args, **kwargs)
-        result = []
-        while (yield cursor.fetch_next):
-            doc = cursor.next_object()
-            result.append(_record(doc) if wrapper else doc)
+        if timeout is None and hedge_delay is None:
+            cursor = reader.find(*args, **kwargs)
+            result = yield cursor.to_list(length=None)
+        else:
+            if timeout is not None:
+                kwargs['max_time_ms'] = max_time_ms(timeout)
+
+            def read(hedge):
+                collect = self._reader(raw, self.hedge_read_preference) if hedge else reader
+                cursor = collect.find(*args, **kwargs)
+                return cursor.to_list(length=None), cursor.close
+
+            result = yield bounded_read(read, timeout, hedge_delay)
+        if wrap is not None:
+            result = [wrap(doc) for doc in result]
 
         raise gen.Return(result)
 
+    def iter_many(self, *args, **kwargs):
+        """stream find result batch by batch instead of loading it all,
+        no limit is applied unless given
+        :args
+            wrapper same as find_many
+            batch_size number of documents fetched per round-trip
+            raw same as find_many
+            read_preference same as find_many
+
+        return DocumentStream
+        """
+        wrap = self._wrapper(kwargs.pop('wrapper', False), _projection_of(args, kwargs))
+        reader = self._reader(kwargs.pop('raw', False), kwargs.pop('read_preference', None))
+        batch_size = kwargs.pop('batch_size', self.batch_size)
+        cursor = reader.find(*args, batch_size=batch_size, **kwargs)
+        return DocumentStream(cursor, batch_size, wrap)
+
+    def iter_aggregate(self, pipeline, **kwargs):
+        """stream aggregation result batch by batch like iter_many
+        :args
+            wrapper same as find_many
+            batch_size number of documents fetched per round-trip
+            allow_disk_use let sort and group stages spill to disk
+            read_preference same as find_many
+
+        return DocumentStream
+        """
+        wrap = self._wrapper(kwargs.pop('wrapper', False))
+        reader = self._reader(False, kwargs.pop('read_preference', None))
+        batch_size = kwargs.pop('batch_size', self.batch_size)
+        if kwargs.pop('allow_disk_use', False):
+            kwargs['allowDiskUse'] = True
+        cursor = reader.aggregate(pipeline, batchSize=batch_size, **kwargs)
+        return DocumentStream(cursor, batch_size, wrap)
+
+    @instrument(count=lambda result: len(result[0]))
+    @gen.coroutine
+    def aggregate_page(self, filter_=None, projection=None, sort=None, skip=0, limit=20,
+                       pipeline=None, allow_disk_use=False, wrapper=False, read_preference=None):
+        """one page and the total of matched documents in one $facet query
+        instead of find_many plus count, needs mongodb 3.4
+
+            docs, total = yield model.aggregate_page({'uid': uid}, sort=[('atime', -1)], skip=40)
+
+        :args
+            projection dict of $project stage applied to the page only
+            sort list of (key, direction) applied before paging, _id is
+                appended as tie-breaker so pages do not overlap
+            pipeline stages run after $match, before sort and paging
+            allow_disk_use let sort and group stages spill to disk
+            wrapper same as find_many
+
+        the page is returned inside one document and must stay under 16MB
+
+        return [documents, total]
+        """
+        stages = []
+        if filter_:
+            stages.append({'$match': filter_})
+        stages.extend(pipeline or [])
+        if sort:
+            stages.append({'$sort': SON(page_util.normalize_sort(sort))})
+
+        page = [{'$skip': skip}, {'$limit': limit}]
+        if projection:
+            page.append({'$project': projection})
+        stages.append({'$facet': {'docs': page, 'total': [{'$count': 'n'}]}})
+
+        kwargs = {'allowDiskUse': True} if allow_disk_use else {}
+        cursor = self._reader(False, read_preference).aggregate(stages, **kwargs)
+        result = yield cursor.to_list(length=1)
+
+        docs, total = result[0]['docs'], result[0]['total']
+        total = total[0]['n'] if total else 0
+        wrap = self._wrapper(wrapper, projection)
+        if wrap is not None:
+            docs = [wrap(doc) for doc in docs]
+        raise gen.Return([docs, total])
+
+    @instrument()
     @gen.coroutine
     def update_one(self, filter_, document, **kwargs):
         """update method
         """
         self._valide_update_document(document)
         result = yield self.__collect.update_one(filter_, document, **kwargs)
+        self._invalidate(filter_)
         raise gen.Return(result)
 
+    @instrument()
     @gen.coroutine
     def update_many(self, filter_, document, **kwargs):
         self._valide_update_document(document)
         result = yield self.__collect.update_many(filter_, document, **kwargs)
+        self._invalidate(filter_)
         raise gen.Return(result)
 
+    @instrument()
     @gen.coroutine
     def delete_many(self, filter_):
         if isinstance(filter_, dict) and filter_ == {}:
@@ -169,37 +839,199 @@ class BaseBaseModel(AbstractModel):
             raise ValueError("not allowed remove all documents")
 
         result = yield self.__collect.delete_many(filter_)
+        self._invalidate(filter_)
         raise gen.Return(result)
 
+    @instrument()
     @gen.coroutine
-    def find_by_id(self, _id, projection=None):
+    def find_by_id(self, _id, projection=None, ordered=False, as_dict=False,
+                   chunk_size=None, concurrency=None, raw=False, read_preference=None,
+                   timeout=None):
         """find record by _id
+        list of _id is queried in chunks of chunk_size with at most
+        concurrency queries in flight
+        :args
+            ordered return documents aligned with _id, None for missing
+            as_dict return _id -> document mapping
+            raw return RawBSONDocument, bypass cache and coalesce_reads
+            read_preference of this call, bypass cache and coalesce_reads
+            timeout seconds of the whole call, chunks share it, default
+                model read_timeout
         """
+        direct = raw or read_preference is not None
         if isinstance(_id, list) or isinstance(_id, tuple):
-            result = yield self.find_many(
-                {'_id': {'$in': [self._to_primary_key(i) for i in _id]}},
-                projection, limit=len(_id))
-            raise gen.Return(result)
+            ids = [self._to_primary_key(i) for i in _id]
+            timeout = timeout or self.read_timeout
+            deadline = IOLoop.current().time() + timeout if timeout is not None else None
+            if self.__cache is None or direct:
+                result = yield self._find_by_ids(
+                    ids, projection, chunk_size, concurrency, raw, read_preference, deadline)
+            else:
+                result = yield self._find_by_ids_cached(ids, projection, chunk_size, concurrency, deadline)
+            raise gen.Return(_shape_by_id(result, ids, ordered, as_dict))
 
         document_id = self._to_primary_key(_id)
 
         if document_id is None:
             raise gen.Return(None)
 
-        result = yield self.__collect.find_one({'_id': document_id}, projection)
+        if direct:
+            result = yield self._bounded_find_one(
+                raw, read_preference, timeout, {'_id': document_id}, projection)
+            raise gen.Return(result)
+
+        if self.__cache is not None:
+            result = yield self._find_by_id_cached(document_id, projection, timeout)
+            raise gen.Return(result)
+
+        result = yield self._find_one({'_id': document_id}, projection, timeout)
         raise gen.Return(result)
 
+    @gen.coroutine
+    def _find_by_ids(self, ids, projection, chunk_size=None, concurrency=None,
+                     raw=False, read_preference=None, deadline=None):
+        """$in queries of chunk_size _id, each one bounded by the time
+        left before deadline
+        """
+        chunk_size = chunk_size or self.id_chunk_size
+        if len(ids) <= chunk_size:
+            result = yield self._find_many(
+                {'_id': {'$in': ids}}, projection, limit=len(ids),
+                raw=raw, read_preference=read_preference, timeout=time_left(deadline))
+            raise gen.Return(result)
+
+        semaphore = locks.Semaphore(concurrency or self.id_concurrency)
+
+        @gen.coroutine
+        def find_chunk(chunk):
+            with (yield semaphore.acquire()):
+                docs = yield self._find_many(
+                    {'_id': {'$in': chunk}}, projection, limit=len(chunk),
+                    raw=raw, read_preference=read_preference, timeout=time_left(deadline))
+            raise gen.Return(docs)
+
+        chunks = yield [find_chunk(ids[i:i + chunk_size]) for i in range(0, len(ids), chunk_size)]
+        raise gen.Return([doc for docs in chunks for doc in docs])
+
+    def load_by_id(self, _id, projection=None):
+        """like find_by_id, but calls issued in the same ioloop tick
+        are resolved by one $in query, list of _id return documents
+        aligned with _id, None for missing
+
+        return future
+        """
+        loader = get_loader(
+            self.__handles.loaders, self._shared_key(), self.loader_window, self.loader_max_batch)
+        if isinstance(_id, list) or isinstance(_id, tuple):
+            return loader.load_many(self, _id, projection)
+
+        return loader.load(self, _id, projection)
+
+    @gen.coroutine
+    def _find_one(self, filter_, projection=None, timeout=None, read_preference=None):
+        """find_one sharing one query among identical concurrent reads
+        when coalesce_reads is enabled, every caller get its own shallow copy
+        """
+        if not self.coalesce_reads:
+            result = yield self._bounded_find_one(False, read_preference, timeout, filter_, projection)
+            raise gen.Return(result)
+
+        # reads routed to other members are not shared, nor reads started
+        # before a cache invalidation
+        generation = self.__cache.generation if self.__cache is not None else None
+        key = (id(self._reader(False, read_preference)._collect), generation,
+               query_key(filter_), query_key(projection))
+        future = _inflight.get(key)
+        if future is None:
+            future = _inflight[key] = self._bounded_find_one(
+                False, read_preference, timeout, filter_, projection)
+
+            def done(f):
+                if _inflight.get(key) is f:
+                    del _inflight[key]
+            future.add_done_callback(done)
+
+        result = yield future
+        raise gen.Return(dict(result) if result is not None else None)
+
+    def _bounded_find_one(self, raw, read_preference, timeout, filter_, *args, **kwargs):
+        """find_one future bounded by timeout, default model read_timeout,
+        and hedged after model hedge_delay
+        """
+        reader = self._reader(raw, read_preference)
+        timeout = timeout or self.read_timeout
+        hedge_delay = self._hedge_delay(read_preference)
+        if timeout is None and hedge_delay is None:
+            return reader.find_one(filter_, *args, **kwargs)
+
+        if timeout is not None:
+            kwargs['max_time_ms'] = max_time_ms(timeout)
+
+        def read(hedge):
+            collect = self._reader(raw, self.hedge_read_preference) if hedge else reader
+            return collect.find_one(filter_, *args, **kwargs), None
+
+        return bounded_read(read, timeout, hedge_delay)
+
+    def _hedge_delay(self, read_preference):
+        """reads pinned to primary, like cache fills, are never hedged to
+        another member
+        """
+        return None if read_preference == 'primary' else self.hedge_delay
+
+    @gen.coroutine
+    def _find_by_id_cached(self, document_id, projection, timeout=None):
+        """read through cache, a shallow copy of cached document is returned
+        """
+        key = (document_id, query_key(projection))
+        doc = self.__cache.get(key)
+        if doc is None:
+            since = self.__cache.generation
+            doc = yield self._find_one({'_id': document_id}, projection, timeout, _FILL_READ_PREFERENCE)
+            if doc is None:
+                raise gen.Return(None)
+            self.__cache.set(key, doc, document_id, since)
+
+        raise gen.Return(dict(doc))
+
+    @gen.coroutine
+    def _find_by_ids_cached(self, ids, projection, chunk_size=None, concurrency=None, deadline=None):
+        """read list of _id through cache, only missing ones are queried
+        """
+        projection_key = query_key(projection)
+        result, missing = [], []
+        for i in ids:
+            doc = self.__cache.get((i, projection_key))
+            if doc is None:
+                missing.append(i)
+            else:
+                result.append(dict(doc))
+
+        if missing:
+            since = self.__cache.generation
+            docs = yield self._find_by_ids(
+                missing, projection, chunk_size, concurrency, read_preference=_FILL_READ_PREFERENCE, deadline=deadline)
+            for doc in docs:
+                self.__cache.set((doc['_id'], projection_key), doc, doc['_id'], since)
+                result.append(dict(doc))
+
+        raise gen.Return(result)
+
+    @instrument()
     @gen.coroutine
     def remove_by_id(self, _id):
         if isinstance(_id, list) or isinstance(_id, tuple):
-            result = yield self.__collect.delete_many(
-                {'_id': {'$in': [self._to_primary_key(i) for i in _id]}})
+            filter_ = {'_id': {'$in': [self._to_primary_key(i) for i in _id]}}
+            result = yield self.__collect.delete_many(filter_)
+            self._invalidate(filter_)
             raise gen.Return(result)
 
-        result = yield self.__collect.delete_one(
-            {'_id': self._to_primary_key(_id)})
+        filter_ = {'_id': self._to_primary_key(_id)}
+        result = yield self.__collect.delete_one(filter_)
+        self._invalidate(filter_)
         raise gen.Return(result)
 
+    @instrument()
     @gen.coroutine
     def find_new_one(self, *args, **kwargs):
         cur = self.__collect.find(*args, **kwargs)
@@ -207,24 +1039,106 @@ class BaseBaseModel(AbstractModel):
         for document in (yield cur.to_list(length=1)):
             raise gen.Return(document)
 
+    @instrument(count=lambda result: len(result[0]))
+    @gen.coroutine
+    def find_page(self, filter_=None, projection=None, sort=None, limit=20,
+                  token=None, wrapper=False):
+        """keyset pagination, every page cost the same whatever its depth
+
+            docs, token = yield model.find_page({'uid': uid}, sort=[('atime', -1)])
+            docs, token = yield model.find_page({'uid': uid}, sort=[('atime', -1)], token=token)
+
+        :args
+            sort list of (key, direction), _id is appended as tie-breaker,
+                default _id descending, sort keys must exist in every document
+            token continuation token returned by previous page
+            wrapper same as find_many
+
+        return [documents, token of next page or None at the last page]
+        """
+        sort = page_util.normalize_sort(sort)
+        if token is not None:
+            after = page_util.keyset_filter(sort, page_util.decode_token(token, len(sort)))
+            filter_ = {'$and': [filter_, after]} if filter_ else after
+
+        for key, _ in sort:
+            projection = _projection_with(projection, key)
+
+        cursor = self.__collect.find(filter_, projection, sort=sort, limit=limit + 1)
+        docs = yield cursor.to_list(length=None)
+
+        next_token = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_token = page_util.encode_token([_get_field(docs[-1], key) for key, _ in sort])
+
+        wrap = self._wrapper(wrapper, projection)
+        if wrap is not None:
+            docs = [wrap(doc) for doc in docs]
+        raise gen.Return([docs, next_token])
+
+    @instrument(count=_count_as_dict)
     @gen.coroutine
     def get_as_dict(self, *args, **kwargs):
         """no limit argument, result will be all record in collection
+        :args
+            key field used as dict key, default _id, dotted path allowed
+            result 'both' return [as_dict, as_list], 'dict' or 'list' only one
+            max_size raise ValueError if more documents matched
+            projection default model column, key field is always included
+            raw documents are RawBSONDocument decoded on field access
+            read_preference of this call, default model read_preference
         """
-        cur = self.__collect.find(*args, **kwargs)
-        as_dict, as_list = {}, []
-        while (yield cur.fetch_next):
-            doc = cur.next_object()
-            as_dict[doc['_id']] = doc
-            as_list.append(doc)
+        key = kwargs.pop('key', '_id')
+        reader = self._reader(kwargs.pop('raw', False), kwargs.pop('read_preference', None))
+        max_size = kwargs.pop('max_size', None)
+        collector = _AsDict(key, kwargs.pop('result', 'both'), max_size)
+        args, kwargs = _as_dict_query(args, kwargs, key, self.column, self.batch_size, max_size)
+
+        cur = reader.find(*args, **kwargs)
+        while True:
+            batch = yield cur.to_list(length=kwargs['batch_size'])
+            if not batch:
+                break
 
-        raise gen.Return([as_dict, as_list])
+            if collector.add(batch):
+                yield cur.close()
+                raise ValueError(
+                    "get_as_dict matched more than %s documents in %s" % (max_size, self.name))
 
+        raise gen.Return(collector.result())
+
+    @instrument()
     @gen.coroutine
-    def inc(self, filter_, key, num=1):
+    def inc(self, filter_, key, num=1, buffered=None):
+        """$inc key of one document
+        :args
+            buffered sum increment in memory, default inc_interval > 0,
+            return None instead of update result
+        """
+        if buffered is None:
+            buffered = self.inc_interval > 0
+        if buffered:
+            self._counter().inc(self, filter_, key, num)
+            raise gen.Return(None)
+
         result = yield self.__collect.update_one(filter_, {'$inc': {key: num}})
+        self._invalidate(filter_)
         raise gen.Return(result)
 
+    def pending_inc(self, filter_, key):
+        """buffered increment of key not written yet
+        """
+        return self._counter().pending(filter_, key)
+
+    def flush_inc(self):
+        """write buffered increments, return future
+        """
+        return self._counter().flush()
+
+    def _counter(self):
+        return get_counter(self.__handles.counters, self._shared_key(), self.inc_interval or 1)
+
 
 class BaseModel(BaseBaseModel):
     pass
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+import base64
+
+from bson import BSON
+from pymongo import ASCENDING
+from pymongo import DESCENDING
+
+
+def normalize_sort(sort=None):
+    """sort as list of (key, direction), _id is appended as tie-breaker,
+    default _id descending like find_new_one
+    """
+    if not sort:
+        return [('_id', DESCENDING)]
+
+    if not isinstance(sort, (list, tuple)):
+        sort = [(sort, ASCENDING)]
+
+    sort = [(k, d) for k, d in sort]
+    if '_id' not in [k for k, d in sort]:
+        sort.append(('_id', sort[-1][1]))
+    return sort
+
+
+def encode_token(values):
+    """opaque continuation token of last sort key values
+    """
+    return base64.urlsafe_b64encode(BSON.encode({'v': list(values)})).decode('ascii')
+
+
+def decode_token(token, size):
+    try:
+        values = BSON(base64.urlsafe_b64decode(str(token))).decode()['v']
+    except Exception:
+        raise ValueError('invalid page token')
+
+    if len(values) != size:
+        raise ValueError('page token does not match sort')
+    return values
+
+
+def keyset_filter(sort, values):
+    """filter of documents after values in sort order
+
+        (a asc, b desc) after (1, 2)
+        {'$or': [{'a': {'$gt': 1}}, {'a': 1, 'b': {'$lt': 2}}]}
+    """
+    clauses = []
+    for index, (key, direction) in enumerate(sort):
+        clause = dict((k, v) for (k, d), v in zip(sort[:index], values[:index]))
+        clause[key] = {'$gt' if direction == ASCENDING else '$lt': values[index]}
+        clauses.append(clause)
+
+    if len(clauses) == 1:
+        return clauses[0]
+    return {'$or': clauses}
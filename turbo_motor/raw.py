@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+import json
+
+import bson
+from bson import json_util
+from bson.codec_options import CodecOptions
+from bson.codec_options import DEFAULT_CODEC_OPTIONS
+from bson.raw_bson import RawBSONDocument
+
+try:
+    import bsonjs
+except ImportError:
+    bsonjs = None
+
+# codec of model reads with raw=True, documents keep their BSON bytes and
+# decode a field only when it is accessed
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+def is_raw(doc):
+    return isinstance(doc, RawBSONDocument)
+
+
+def decode(value, codec_options=DEFAULT_CODEC_OPTIONS):
+    """decode RawBSONDocument or list of them to dict, a list is decoded by
+    one bson.decode_all call on its joined bytes, other values returned as is
+    """
+    if isinstance(value, RawBSONDocument):
+        return bson.BSON(value.raw).decode(codec_options)
+
+    if isinstance(value, (list, tuple)) and value and all(isinstance(v, RawBSONDocument) for v in value):
+        return bson.decode_all(b''.join(v.raw for v in value), codec_options)
+
+    return value
+
+
+def to_json(value, **kwargs):
+    """serialize documents returned by model reads with raw=True to
+    extended json
+
+        self.write(to_json((yield model.find_many(filter_, limit=20, raw=True))))
+
+    with python-bsonjs installed and no json.dumps kwargs, raw documents
+    are converted from their BSON bytes in C and never decoded to python,
+    otherwise they are decoded like decode and dumped with json_util,
+    dates are then epoch milliseconds instead of ISO 8601
+    """
+    if bsonjs is not None and not kwargs:
+        if isinstance(value, RawBSONDocument):
+            return bsonjs.dumps(value.raw)
+        if isinstance(value, (list, tuple)) and value and all(isinstance(v, RawBSONDocument) for v in value):
+            return '[%s]' % ', '.join(bsonjs.dumps(v.raw) for v in value)
+
+    return json.dumps(decode(value), default=json_util.default, **kwargs)
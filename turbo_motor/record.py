@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+import re
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class BaseRecord(object):
+    """wrap a document without copying it, missing field return its model
+    default, missing unknown key or field left out by the projection
+    return None like _record
+    """
+
+    __slots__ = ('_doc',)
+
+    # field -> default value, field -> factory of mutable default
+    _defaults = {}
+    _factories = {}
+
+    def __init__(self, doc):
+        self._doc = doc
+
+    def __getitem__(self, k):
+        try:
+            return self._doc[k]
+        except KeyError:
+            return self._default(k)
+
+    def __setitem__(self, k, v):
+        self._doc[k] = v
+
+    def __delitem__(self, k):
+        del self._doc[k]
+
+    def __contains__(self, k):
+        return k in self._doc
+
+    def __iter__(self):
+        return iter(self._doc)
+
+    def __len__(self):
+        return len(self._doc)
+
+    def __eq__(self, other):
+        if isinstance(other, BaseRecord):
+            other = other._doc
+        return self._doc == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self._doc)
+
+    def _default(self, k):
+        factory = self._factories.get(k)
+        if factory is not None:
+            return factory()
+        return self._defaults.get(k)
+
+    def get(self, k, default=None):
+        """like record[k], default given replaces the model default
+        """
+        try:
+            return self._doc[k]
+        except KeyError:
+            return self._default(k) if default is None else default
+
+    def keys(self):
+        return self._doc.keys()
+
+    def values(self):
+        return self._doc.values()
+
+    def items(self):
+        return self._doc.items()
+
+    def to_dict(self):
+        """the wrapped document itself
+        """
+        return self._doc
+
+
+def _field_property(k):
+    def fget(self):
+        try:
+            return self._doc[k]
+        except KeyError:
+            return self._default(k)
+    return property(fget)
+
+
+def kept_fields(field, projection):
+    """fields of the model returned with projection, None when all are
+    """
+    if not projection:
+        return None
+
+    names = set(field) | set(['_id'])
+    if not isinstance(projection, dict):
+        return (frozenset(k.split('.')[0] for k in projection) & names) | frozenset(['_id'])
+
+    # $slice and $elemMatch do not make a projection inclusive
+    included = set(k.split('.')[0] for k, v in projection.items() if v and not isinstance(v, dict))
+    excluded = set(k for k, v in projection.items() if not v)
+    if included and not excluded - set(['_id']):
+        if projection.get('_id', True):
+            included.add('_id')
+        return frozenset(included & names)
+
+    excluded = set(k for k in excluded if '.' not in k)
+    return frozenset(names - excluded) if excluded else None
+
+
+def make_record_class(name, field, fields=None):
+    """generate BaseRecord subclass with one read only attribute per field
+    :args
+        fields kept_fields of the projection, other fields have no default
+    """
+    defaults, factories = {}, {}
+    for k, v in field.items():
+        if fields is not None and k not in fields:
+            continue
+        default = v[1]
+        if isinstance(default, (list, dict, set)):
+            factories[k] = lambda default=default: type(default)(default)
+        else:
+            defaults[k] = default
+
+    attrs = {
+        '__slots__': (),
+        '_defaults': defaults,
+        '_factories': factories,
+    }
+    # field shadowed by a BaseRecord method or not an identifier is item only
+    for k in set(field) | set(['_id']):
+        if _IDENTIFIER.match(k) and not hasattr(BaseRecord, k):
+            attrs[k] = _field_property(k)
+
+    return type(str('%sRecord' % name), (BaseRecord,), attrs)
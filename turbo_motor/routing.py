@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+from pymongo.read_preferences import Nearest
+from pymongo.read_preferences import Primary
+from pymongo.read_preferences import PrimaryPreferred
+from pymongo.read_preferences import Secondary
+from pymongo.read_preferences import SecondaryPreferred
+
+_MODES = {
+    'primaryPreferred': PrimaryPreferred,
+    'secondary': Secondary,
+    'secondaryPreferred': SecondaryPreferred,
+    'nearest': Nearest,
+}
+
+
+def read_preference(mode, max_staleness=-1):
+    """read preference of mode name, max_staleness seconds apply to every
+    mode but primary, -1 no limit, a pymongo read preference is returned as is
+
+        read_preference('secondaryPreferred', 90)
+    """
+    if mode is None or hasattr(mode, 'document'):
+        return mode
+
+    if mode == 'primary':
+        return Primary()
+
+    if mode not in _MODES:
+        raise ValueError('invalid read preference %s' % mode)
+
+    return _MODES[mode](max_staleness=max_staleness)
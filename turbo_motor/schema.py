@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+from datetime import datetime
+import time
+
+
+class Schema(object):
+    """model field compiled once, validate and fill record like
+    AbstractModel._valid_record without walking field for every record
+
+        field = {'name': (basestring, None), 'atime': (datetime, None)}
+        keys        frozenset of field keys except _id
+        defaults    key -> default value
+        factories   key -> model method name, datetime or timestamp,
+                    called when the field default is empty
+    """
+
+    __slots__ = ('keys', 'defaults', 'factories')
+
+    def __init__(self, field):
+        keys, defaults, factories = set(field), {}, {}
+        keys.discard('_id')
+        for k in keys:
+            type_, default = field[k][0], field[k][1]
+            if type_ is datetime and not default:
+                factories[k] = 'datetime'
+            elif type_ is time and not default:
+                factories[k] = 'timestamp'
+            else:
+                defaults[k] = default
+
+        self.keys = frozenset(keys)
+        self.defaults = defaults
+        self.factories = factories
+
+    def validate(self, model, record):
+        if not isinstance(record, dict):
+            raise Exception('%s record is not dict' % record)
+
+        if not self.keys.issuperset(record):
+            extra = [k for k in record if k not in self.keys and k != '_id']
+            if extra:
+                raise Exception('record keys is not equal to fields keys %s' % extra)
+
+        if len(record) - ('_id' in record) == len(self.keys):
+            return record
+
+        for k in self.keys.difference(record):
+            name = self.factories.get(k)
+            record[k] = getattr(model, name)() if name else self.defaults[k]
+
+        return record
+
+
+def get_schema(model_class):
+    """Schema of model class field, compiled on first use and kept on the
+    class itself, subclass overriding field get its own
+    """
+    schema = model_class.__dict__.get('_schema')
+    if schema is None:
+        schema = Schema(model_class.field)
+        model_class._schema = schema
+    return schema
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+import time
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+from turbo.log import model_log
+
+from turbo_motor.cache import freeze
+
+# operations report when slower than model slow_query_threshold
+SLOW_OPERATIONS = frozenset([
+    'aggregate_page',
+    'find_one',
+    'find_many',
+    'find_by_id',
+    'find_new_one',
+    'find_page',
+    'get_as_dict',
+    'update',
+    'update_one',
+    'update_many',
+])
+
+# (collection, operation, filter shape) -> last report time
+_reported = {}
+
+
+def query_shape(value):
+    """filter with every value replaced by '?', keys and operators kept
+    """
+    if isinstance(value, dict):
+        return dict((k, query_shape(v)) for k, v in value.items())
+
+    if isinstance(value, (list, tuple)):
+        # $and / $or list of sub filters keep their shape, values collapse
+        shapes = [query_shape(v) for v in value if isinstance(v, dict)]
+        return shapes or ['?']
+
+    return '?'
+
+
+def describe(operation, args, kwargs):
+    """filter, projection, sort, limit and skip of a model read or update call
+    """
+    if operation == 'find_by_id':
+        _id = args[0] if args else kwargs.get('_id')
+        if isinstance(_id, (list, tuple)):
+            filter_ = {'_id': {'$in': list(_id)}}
+        else:
+            filter_ = {'_id': _id}
+    else:
+        filter_ = args[0] if args else kwargs.get('filter', kwargs.get('filter_'))
+
+    projection = None
+    if not operation.startswith('update'):
+        projection = args[1] if len(args) > 1 else kwargs.get('projection')
+
+    return {
+        'filter': filter_,
+        'projection': projection,
+        'sort': kwargs.get('sort'),
+        'limit': kwargs.get('limit'),
+        'skip': kwargs.get('skip'),
+    }
+
+
+def plan_summary(plan):
+    """stage chain of an explain winning plan like FETCH > IXSCAN(uid_1)
+    """
+    stages = []
+    while plan:
+        stage = plan.get('stage', '?')
+        if plan.get('indexName'):
+            stage = '%s(%s)' % (stage, plan['indexName'])
+        stages.append(stage)
+        plan = plan.get('inputStage') or (plan.get('inputStages') or [None])[0]
+    return ' > '.join(stages)
+
+
+def report(model, operation, duration, args, kwargs):
+    """log slow operation at most once per model slow_query_interval seconds
+    for every filter shape, explain it in background when slow_query_explain
+    """
+    query = describe(operation, args, kwargs)
+    shape = query_shape(query['filter'])
+    key = (model.name, operation, freeze(shape))
+    now = time.time()
+    if now - _reported.get(key, 0) < model.slow_query_interval:
+        return
+    _reported[key] = now
+
+    model_log.warning('slow %s.%s %.1fms filter=%s projection=%s sort=%s limit=%s skip=%s' % (
+        model.name, operation, duration * 1000, shape, query['projection'],
+        query['sort'], query['limit'], query['skip']))
+
+    if model.slow_query_explain:
+        IOLoop.current().spawn_callback(_explain, model, operation, query)
+
+
+@gen.coroutine
+def _explain(model, operation, query):
+    """updates are explained as the find of their filter
+    """
+    try:
+        cursor = model.find(query['filter'], query['projection'])
+        if query['sort']:
+            cursor.sort(query['sort'])
+        if query['limit']:
+            cursor.limit(query['limit'])
+        if query['skip']:
+            cursor.skip(query['skip'])
+        result = yield cursor.explain()
+        plan = result.get('queryPlanner', {}).get('winningPlan', {})
+        model_log.warning('slow %s.%s filter=%s plan %s' % (
+            model.name, operation, query_shape(query['filter']), plan_summary(plan)))
+    except Exception:
+        model_log.exception('explain slow %s.%s failed' % (model.name, operation))
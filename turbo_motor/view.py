@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import with_statement
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+from turbo.log import model_log
+
+# seconds between checks that a new change stream cursor is open
+_OPEN_POLL_INTERVAL = 0.005
+
+
+def projection_fields(projection):
+    """top level field names kept by an inclusion projection, None keep all
+    """
+    if not projection:
+        return None
+
+    if isinstance(projection, dict):
+        if any(not v for k, v in projection.items() if k != '_id'):
+            raise ValueError('materialized view support inclusion projection only')
+        fields = set(k for k, v in projection.items() if v)
+    else:
+        fields = set(projection)
+
+    if '.' in ''.join(fields):
+        raise ValueError('materialized view support top level fields only')
+    fields.add('_id')
+    return frozenset(fields)
+
+
+class MaterializedView(object):
+    """in memory _id -> document view of a whole collection, loaded once
+    then kept current by a change stream, cached documents of the model
+    are invalidated on every change
+
+        view = model.materialized_view(['name', 'value'])
+        yield view.start()
+        view.get(_id)
+        yield view.stop()
+
+    change streams need a replica set, documents returned are the view's
+    own, do not mutate them
+
+    a broken stream is resumed with the last resume token after
+    retry_interval seconds, the view is reloaded when resuming fails
+    """
+
+    def __init__(self, model, collection, projection=None, on_change=None, retry_interval=1.0):
+        self.model = model
+        self.retry_interval = retry_interval
+        # on_change(operation, _id, document or None) after every change
+        self.on_change = on_change
+        self.resume_token = None
+        self._collection = collection
+        self._projection = projection
+        self._fields = projection_fields(projection)
+        self._docs = {}
+        self._stream = None
+        self._stopped = True
+        self.ready = False
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, _id):
+        return _id in self._docs
+
+    def get(self, _id, default=None):
+        return self._docs.get(_id, default)
+
+    def get_many(self, ids):
+        """documents aligned with ids, None for missing
+        """
+        return [self._docs.get(i) for i in ids]
+
+    def items(self):
+        return self._docs.items()
+
+    def values(self):
+        return self._docs.values()
+
+    @gen.coroutine
+    def start(self):
+        """load the collection then follow its changes in background
+        """
+        if not self._stopped:
+            return
+
+        self._stopped = False
+        try:
+            pending = yield self._reload()
+        except Exception:
+            # leave the view stopped so start can be retried
+            yield self._close_stream()
+            self._stopped = True
+            raise
+        IOLoop.current().spawn_callback(self._follow, pending)
+
+    @gen.coroutine
+    def stop(self):
+        self._stopped = True
+        self.ready = False
+        yield self._close_stream()
+
+    def _open(self, resume_after=None):
+        """open change stream, return future of its first change, asking
+        for it starts the stream on the server
+        """
+        kwargs = {'full_document': 'updateLookup'}
+        if resume_after is not None:
+            kwargs['resume_after'] = resume_after
+        self._stream = self._collection.watch(**kwargs)
+        return self._stream.next()
+
+    @gen.coroutine
+    def _close_stream(self):
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            try:
+                yield stream.close()
+            except Exception:
+                model_log.exception('close change stream of %s failed' % self.model.name)
+
+    @gen.coroutine
+    def _reload(self):
+        """open a new stream and load once its cursor exists, changes made
+        during the load are applied after it, applying a change twice is
+        harmless
+        """
+        yield self._close_stream()
+        self.resume_token = None
+        pending = self._open()
+        stream = self._stream
+        pending.add_done_callback(lambda f: f.exception())
+        # motor opens the cursor in its first next on an executor thread,
+        # a load started before would miss changes made until it is open
+        while stream.delegate is None and not pending.done():
+            yield gen.sleep(_OPEN_POLL_INTERVAL)
+        if pending.done() and pending.exception() is not None:
+            yield pending
+
+        docs = yield self._collection.find({}, self._projection).to_list(length=None)
+        self._docs = dict((doc['_id'], doc) for doc in docs)
+        self.model._invalidate(None)
+        self.ready = True
+        raise gen.Return(pending)
+
+    @gen.coroutine
+    def _follow(self, pending):
+        resumed = False
+        while not self._stopped:
+            try:
+                if pending is None:
+                    pending = yield self._reload()
+                change = yield pending
+            except Exception:
+                if self._stopped:
+                    break
+
+                model_log.exception('change stream of %s failed' % self.model.name)
+                yield gen.sleep(self.retry_interval)
+                if self._stopped:
+                    break
+
+                yield self._close_stream()
+                if self.resume_token is not None and not resumed:
+                    pending, resumed = self._open(self.resume_token), True
+                else:
+                    pending, resumed = None, False
+                continue
+
+            pending, resumed = self._stream.next(), False
+            self._apply(change)
+
+    def _apply(self, change):
+        operation = change['operationType']
+        self.resume_token = change['_id']
+        if operation == 'invalidate':
+            # collection dropped or renamed, the stream can not be resumed
+            self.resume_token = None
+            self._docs.clear()
+            self.model._invalidate(None)
+            return
+
+        _id = change['documentKey']['_id']
+        doc = change.get('fullDocument') if operation != 'delete' else None
+        if doc is None:
+            self._docs.pop(_id, None)
+        else:
+            if self._fields is not None:
+                doc = dict((k, v) for k, v in doc.items() if k in self._fields)
+            self._docs[_id] = doc
+
+        self.model._invalidate({'_id': _id})
+        if self.on_change is not None:
+            self.on_change(operation, _id, doc)